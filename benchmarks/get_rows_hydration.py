@@ -0,0 +1,140 @@
+# compares orm hydration (the old get_rows path) with the core select + Row._mapping path.
+# rows are inserted inside a transaction that is rolled back, the table is left untouched.
+#
+# usage: python benchmarks/get_rows_hydration.py [database_name] [schema_name] [table_name]
+# defaults to square.public.test from square_database_structure, rows for other tables
+# are generated from their column types.
+
+import datetime
+import decimal
+import sys
+import time
+import uuid
+
+from sqlalchemy import JSON, Enum, insert, select
+from sqlalchemy.orm import Session
+
+from square_database.utils.database_engines import get_database_engine
+from square_database.utils.table_descriptors import get_table_descriptor
+
+global_list_row_counts = [1_000, 10_000, 100_000]
+global_int_repeat = 3
+
+
+def get_sample_value(column, index, now):
+    column_type = column.type
+    if isinstance(column_type, Enum):
+        local_list_members = (
+            list(column_type.enum_class)
+            if column_type.enum_class is not None
+            else list(column_type.enums)
+        )
+        return local_list_members[index % len(local_list_members)]
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        python_type = None
+    if python_type is bool:
+        return index % 2 == 0
+    if python_type is int:
+        return index
+    if python_type is float:
+        return index * 1.5
+    if python_type is decimal.Decimal:
+        return decimal.Decimal(index) / 4
+    if python_type is str:
+        return f"benchmark_{index}"[: getattr(column_type, "length", None)]
+    if python_type is datetime.datetime:
+        return now
+    if python_type is datetime.date:
+        return now.date()
+    if python_type is datetime.time:
+        return now.time()
+    if python_type is uuid.UUID:
+        return uuid.uuid4()
+    if python_type is bytes:
+        return f"benchmark_{index}".encode()
+    if python_type in (dict, list) or isinstance(column_type, JSON):
+        return {"key": f"value_{index}", "id": index}
+    if column.nullable:
+        return None
+    raise ValueError(f"no sample value for {column.name} ({column_type!r}).")
+
+
+def build_rows(table_descriptor, row_count):
+    # identity and server generated columns are filled in by the database, foreign
+    # keys would need existing rows in the referenced table.
+    local_dict_columns = {
+        column_name: column
+        for column_name, column in table_descriptor.columns.items()
+        if column is not table_descriptor.table.autoincrement_column
+        and column.server_default is None
+        and column.identity is None
+        and not column.foreign_keys
+    }
+    now = datetime.datetime.now()
+    return [
+        {
+            column_name: get_sample_value(column, index, now)
+            for column_name, column in local_dict_columns.items()
+        }
+        for index in range(row_count)
+    ]
+
+
+def read_with_orm(connection, table_descriptor):
+    with Session(bind=connection) as session:
+        return [
+            {key: value for key, value in x.__dict__.items() if not key.startswith("_")}
+            for x in session.query(table_descriptor.table_class).all()
+        ]
+
+
+def read_with_core(connection, table_descriptor):
+    statement = select(
+        *[
+            column.label(column_name)
+            for column_name, column in table_descriptor.columns.items()
+        ]
+    )
+    return [dict(row._mapping) for row in connection.execute(statement)]
+
+
+def best_of(function, *args):
+    local_float_best = None
+    for _ in range(global_int_repeat):
+        local_float_start = time.perf_counter()
+        function(*args)
+        local_float_elapsed = time.perf_counter() - local_float_start
+        if local_float_best is None or local_float_elapsed < local_float_best:
+            local_float_best = local_float_elapsed
+    return local_float_best
+
+
+def main(database_name="square", schema_name="public", table_name="test"):
+    table_descriptor = get_table_descriptor(database_name, schema_name, table_name)
+    database_engine = get_database_engine(database_name)
+    print(f"{'rows':>8} {'orm (s)':>10} {'core (s)':>10} {'speedup':>8}")
+    for row_count in global_list_row_counts:
+        with database_engine.connect() as connection:
+            connection = connection.execution_options(
+                schema_translate_map=table_descriptor.schema_translate_map
+            )
+            transaction = connection.begin()
+            try:
+                connection.execute(
+                    insert(table_descriptor.table),
+                    build_rows(table_descriptor, row_count),
+                )
+                local_float_orm = best_of(read_with_orm, connection, table_descriptor)
+                local_float_core = best_of(read_with_core, connection, table_descriptor)
+            finally:
+                transaction.rollback()
+        print(
+            f"{row_count:>8} {local_float_orm:>10.4f} {local_float_core:>10.4f} "
+            f"{local_float_orm / local_float_core:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -34,6 +34,16 @@ try:
     )
     config_str_db_username = ldict_configuration["ENVIRONMENT"]["DB_USERNAME"]
     config_str_db_password = ldict_configuration["ENVIRONMENT"]["DB_PASSWORD"]
+    config_list_db_replicas = eval(ldict_configuration["ENVIRONMENT"]["DB_REPLICAS"])
+    config_float_replica_max_lag_seconds = float(
+        ldict_configuration["ENVIRONMENT"]["REPLICA_MAX_LAG_SECONDS"]
+    )
+    config_float_replica_check_interval_seconds = float(
+        ldict_configuration["ENVIRONMENT"]["REPLICA_CHECK_INTERVAL_SECONDS"]
+    )
+    config_float_replica_check_timeout_seconds = float(
+        ldict_configuration["ENVIRONMENT"]["REPLICA_CHECK_TIMEOUT_SECONDS"]
+    )
     config_str_log_file_name = ldict_configuration["ENVIRONMENT"]["LOG_FILE_NAME"]
     config_bool_create_schema = eval(
         ldict_configuration["ENVIRONMENT"]["CREATE_SCHEMA"]
@@ -47,6 +57,85 @@ try:
     config_str_ssl_key_file_path = ldict_configuration["ENVIRONMENT"][
         "SSL_KEY_FILE_PATH"
     ]
+    config_int_db_pool_size = int(ldict_configuration["ENVIRONMENT"]["DB_POOL_SIZE"])
+    config_int_db_max_overflow = int(
+        ldict_configuration["ENVIRONMENT"]["DB_MAX_OVERFLOW"]
+    )
+    config_int_db_pool_recycle = int(
+        ldict_configuration["ENVIRONMENT"]["DB_POOL_RECYCLE"]
+    )
+    config_int_db_pool_timeout = int(
+        ldict_configuration["ENVIRONMENT"]["DB_POOL_TIMEOUT"]
+    )
+    config_bool_db_pool_pre_ping = eval(
+        ldict_configuration["ENVIRONMENT"]["DB_POOL_PRE_PING"]
+    )
+    config_str_db_maintenance_database_name = ldict_configuration["ENVIRONMENT"][
+        "DB_MAINTENANCE_DATABASE_NAME"
+    ]
+    config_int_catalog_ttl_seconds = int(
+        ldict_configuration["ENVIRONMENT"]["CATALOG_TTL_SECONDS"]
+    )
+    config_bool_enable_async_driver = eval(
+        ldict_configuration["ENVIRONMENT"]["ENABLE_ASYNC_DRIVER"]
+    )
+    config_str_async_db_driver = ldict_configuration["ENVIRONMENT"]["ASYNC_DB_DRIVER"]
+    config_int_db_thread_pool_size = int(
+        ldict_configuration["ENVIRONMENT"]["DB_THREAD_POOL_SIZE"]
+    )
+    config_int_admission_max_concurrency_per_database = int(
+        ldict_configuration["ENVIRONMENT"]["ADMISSION_MAX_CONCURRENCY_PER_DATABASE"]
+    )
+    config_int_admission_max_queue_per_database = int(
+        ldict_configuration["ENVIRONMENT"]["ADMISSION_MAX_QUEUE_PER_DATABASE"]
+    )
+    config_float_admission_max_wait_seconds = float(
+        ldict_configuration["ENVIRONMENT"]["ADMISSION_MAX_WAIT_SECONDS"]
+    )
+    config_int_admission_retry_after_seconds = int(
+        ldict_configuration["ENVIRONMENT"]["ADMISSION_RETRY_AFTER_SECONDS"]
+    )
+    config_int_stream_chunk_size = int(
+        ldict_configuration["ENVIRONMENT"]["STREAM_CHUNK_SIZE"]
+    )
+    config_int_insert_page_size = int(
+        ldict_configuration["ENVIRONMENT"]["INSERT_PAGE_SIZE"]
+    )
+    config_int_insert_copy_threshold = int(
+        ldict_configuration["ENVIRONMENT"]["INSERT_COPY_THRESHOLD"]
+    )
+    config_int_get_rows_many_max_concurrency = int(
+        ldict_configuration["ENVIRONMENT"]["GET_ROWS_MANY_MAX_CONCURRENCY"]
+    )
+    config_int_get_rows_many_statement_timeout_milliseconds = int(
+        ldict_configuration["ENVIRONMENT"][
+            "GET_ROWS_MANY_STATEMENT_TIMEOUT_MILLISECONDS"
+        ]
+    )
+    config_int_statement_cache_size = int(
+        ldict_configuration["ENVIRONMENT"]["STATEMENT_CACHE_SIZE"]
+    )
+    config_int_result_cache_max_bytes = int(
+        ldict_configuration["ENVIRONMENT"]["RESULT_CACHE_MAX_BYTES"]
+    )
+    config_float_result_cache_ttl_seconds = float(
+        ldict_configuration["ENVIRONMENT"]["RESULT_CACHE_TTL_SECONDS"]
+    )
+    config_list_result_cache_tables = eval(
+        ldict_configuration["ENVIRONMENT"]["RESULT_CACHE_TABLES"]
+    )
+    config_list_result_cache_excluded_tables = eval(
+        ldict_configuration["ENVIRONMENT"]["RESULT_CACHE_EXCLUDED_TABLES"]
+    )
+    config_bool_enable_single_flight = eval(
+        ldict_configuration["ENVIRONMENT"]["ENABLE_SINGLE_FLIGHT"]
+    )
+    config_bool_enable_warmup = eval(
+        ldict_configuration["ENVIRONMENT"]["ENABLE_WARMUP"]
+    )
+    config_int_warmup_connections_per_pool = int(
+        ldict_configuration["ENVIRONMENT"]["WARMUP_CONNECTIONS_PER_POOL"]
+    )
 
     # ===========================================
 
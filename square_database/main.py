@@ -1,4 +1,6 @@
+import asyncio
 import os.path
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,6 +11,7 @@ from uvicorn import run
 
 from square_database.configuration import (
     config_bool_create_schema,
+    config_bool_enable_warmup,
     config_int_db_port,
     config_int_host_port,
     config_str_db_ip,
@@ -21,9 +24,28 @@ from square_database.configuration import (
     global_object_square_logger,
     config_list_allow_origins,
 )
-from square_database.routes import core
+from square_database.routes import core, utility
+from square_database.utils.database_engines import dispose_all_database_engines
+from square_database.utils.warmup import global_dict_warmup_state, run_warmup
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = None
+    if config_bool_enable_warmup:
+        # requests are served meanwhile, /ready/v0 tells when warmup is done.
+        warmup_task = asyncio.create_task(run_warmup())
+    else:
+        global_dict_warmup_state["ready"] = True
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    # close pooled connections on shutdown.
+    await dispose_all_database_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +56,7 @@ app.add_middleware(
 )
 
 app.include_router(core.router)
+app.include_router(utility.router)
 
 
 @app.get("/")
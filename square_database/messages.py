@@ -3,10 +3,16 @@ messages = {
     "READ_SUCCESSFUL": "the record has been retrieved successfully.",
     "UPDATE_SUCCESSFUL": "the record has been updated successfully.",
     "DELETE_SUCCESSFUL": "the record has been deleted successfully.",
+    "BATCH_SUCCESSFUL": "all operations in the batch have been applied successfully.",
     "GENERIC_204": "no content available for the requested resource.",
     "GENERIC_400": "the request is invalid or cannot be processed.",
     "GENERIC_500": "an internal server error occurred. please try again later.",
     "INCORRECT_DATABASE_NAME": "the specified database name is incorrect.",
     "INCORRECT_SCHEMA_NAME": "the specified schema name is incorrect.",
     "INCORRECT_TABLE_NAME": "the specified table name is incorrect.",
+    "DATABASE_BUSY": "the database is busy. please retry later.",
+    "DATABASE_UNAVAILABLE": "the database is unavailable. please retry later.",
+    "CATALOG_REFRESH_SUCCESSFUL": "the database catalog has been refreshed successfully.",
+    "SERVICE_READY": "the service is ready to serve requests.",
+    "SERVICE_NOT_READY": "the service is warming up. please retry later.",
 }
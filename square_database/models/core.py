@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Annotated, Dict, Any, List, Literal, Optional, Union
 
 from pydantic import BaseModel, conlist, Field, RootModel
 
@@ -19,12 +19,33 @@ class FiltersV0(RootModel):
     root: Dict[str, FilterConditionsV0]
 
 
-class InsertRowsV0(BaseModel):
-    database_name: str
+class FilterTreeV0(BaseModel):
+    # every part that is set must hold: the column filters (same as FiltersV0),
+    # all of and_, at least one of or_, and not not_.
+    filters: Dict[str, FilterConditionsV0] = Field(default_factory=dict)
+    and_: List["FilterTreeV0"] = Field(default_factory=list)
+    # an empty or_ list matches nothing, leave it out to not use it.
+    or_: Optional[List["FilterTreeV0"]] = None
+    not_: Optional["FilterTreeV0"] = None
+
+
+class UpsertV0(BaseModel):
+    # columns of a unique constraint or index, rows that collide on them get updated.
+    conflict_columns: conlist(str, min_length=1)
+    # defaults to every inserted column except the conflict columns.
+    update_columns: Optional[List[str]] = None
+
+
+class InsertRowsBaseV0(BaseModel):
     table_name: str
     schema_name: str
     data: conlist(Dict[str, Any], min_length=1)
     skip_conflicts: bool = False
+    upsert: Optional[UpsertV0] = None
+
+
+class InsertRowsV0(InsertRowsBaseV0):
+    database_name: str
 
 
 class GetRowsV0(BaseModel):
@@ -32,25 +53,143 @@ class GetRowsV0(BaseModel):
     table_name: str
     schema_name: str
     filters: FiltersV0
+    # ANDed with filters, for or / not and nested groups.
+    filter_tree: Optional[FilterTreeV0] = None
     apply_filters: bool = True
     columns: Optional[List[str]] = None
     order_by: List[str] = Field(default_factory=list)
     limit: Optional[int] = None
     offset: int = 0
+    # keyset pagination, pass back next_cursor from the previous page as cursor.
+    use_cursor: bool = False
+    cursor: Optional[str] = None
+    # exact runs a window count with the page, estimated uses planner statistics,
+    # none skips counting and returns total_count as null.
+    count_mode: Literal["exact", "estimated", "none"] = "exact"
+    # replica reads may lag behind by up to REPLICA_MAX_LAG_SECONDS, primary reads
+    # your own writes.
+    consistency: Literal["replica", "primary"] = "replica"
+
+
+class GetRowsManyV0(BaseModel):
+    # request id -> query, results come back under the same ids.
+    queries: Dict[str, GetRowsV0] = Field(min_length=1)
+
+
+class ExistsRowsV0(BaseModel):
+    database_name: str
+    table_name: str
+    schema_name: str
+    filters: FiltersV0
+    filter_tree: Optional[FilterTreeV0] = None
+    apply_filters: bool = True
+    consistency: Literal["replica", "primary"] = "replica"
 
 
-class EditRowsV0(BaseModel):
+class CountRowsV0(BaseModel):
     database_name: str
     table_name: str
     schema_name: str
     filters: FiltersV0
+    filter_tree: Optional[FilterTreeV0] = None
+    apply_filters: bool = True
+    # stop counting after this many rows, capped in the response means "at least".
+    cap: Optional[int] = Field(default=None, ge=1)
+    consistency: Literal["replica", "primary"] = "replica"
+
+
+class GroupByV0(BaseModel):
+    column: str
+    # buckets date/time values with postgres date_trunc.
+    date_trunc: Optional[
+        Literal[
+            "microseconds",
+            "milliseconds",
+            "second",
+            "minute",
+            "hour",
+            "day",
+            "week",
+            "month",
+            "quarter",
+            "year",
+        ]
+    ] = None
+    # key in the output rows, defaults to the column name.
+    alias: Optional[str] = None
+
+
+class AggregateV0(BaseModel):
+    function: Literal["count", "sum", "avg", "min", "max"]
+    # count without a column counts rows.
+    column: Optional[str] = None
+    distinct: bool = False
+    # key in the output rows, defaults to function_column (count_all for rows).
+    alias: Optional[str] = None
+
+
+class AggregateRowsV0(BaseModel):
+    database_name: str
+    table_name: str
+    schema_name: str
+    filters: FiltersV0
+    filter_tree: Optional[FilterTreeV0] = None
+    apply_filters: bool = True
+    group_by: List[GroupByV0] = Field(default_factory=list)
+    aggregates: conlist(AggregateV0, min_length=1)
+    # aggregate alias -> conditions, applied after grouping.
+    having: Dict[str, FilterConditionsV0] = Field(default_factory=dict)
+    # group_by or aggregate aliases, prefix with - for descending.
+    order_by: List[str] = Field(default_factory=list)
+    limit: Optional[int] = None
+    offset: int = 0
+    consistency: Literal["replica", "primary"] = "replica"
+
+
+class EditRowsBaseV0(BaseModel):
+    table_name: str
+    schema_name: str
+    filters: FiltersV0
+    filter_tree: Optional[FilterTreeV0] = None
     data: Dict[str, Any]
     apply_filters: bool = True
 
 
-class DeleteRowsV0(BaseModel):
+class EditRowsV0(EditRowsBaseV0):
     database_name: str
+
+
+class DeleteRowsBaseV0(BaseModel):
     table_name: str
     schema_name: str
     filters: FiltersV0
+    filter_tree: Optional[FilterTreeV0] = None
     apply_filters: bool = True
+
+
+class DeleteRowsV0(DeleteRowsBaseV0):
+    database_name: str
+
+
+class BatchInsertRowsV0(InsertRowsBaseV0):
+    operation: Literal["insert_rows"]
+
+
+class BatchEditRowsV0(EditRowsBaseV0):
+    operation: Literal["edit_rows"]
+
+
+class BatchDeleteRowsV0(DeleteRowsBaseV0):
+    operation: Literal["delete_rows"]
+
+
+class BatchV0(BaseModel):
+    database_name: str
+    # executed in order inside one transaction, any failure rolls back all of them.
+    operations: conlist(
+        Annotated[
+            Union[BatchInsertRowsV0, BatchEditRowsV0, BatchDeleteRowsV0],
+            Field(discriminator="operation"),
+        ],
+        min_length=1,
+    )
@@ -8,16 +8,27 @@ from square_database.configuration import (
 )
 from square_database.messages import messages
 from square_database.models.core import (
+    AggregateRowsV0,
+    CountRowsV0,
+    ExistsRowsV0,
+    BatchV0,
     DeleteRowsV0,
     EditRowsV0,
+    GetRowsManyV0,
     GetRowsV0,
     InsertRowsV0,
 )
 from square_database.utils.routes.core import (
     util_insert_rows_v0,
     util_get_rows_v0,
+    util_get_rows_many_v0,
+    util_get_rows_stream_v0,
+    util_exists_rows_v0,
+    util_count_rows_v0,
+    util_aggregate_rows_v0,
     util_edit_rows_v0,
     util_delete_rows_v0,
+    util_batch_v0,
 )
 
 router = APIRouter(
@@ -29,10 +40,12 @@ router = APIRouter(
 @global_object_square_logger.auto_logger()
 async def insert_rows_v0(insert_rows_model: InsertRowsV0):
     try:
-        return util_insert_rows_v0(insert_rows_model)
+        return await util_insert_rows_v0(insert_rows_model)
     except HTTPException as he:
         global_object_square_logger.logger.error(he, exc_info=True)
-        return JSONResponse(status_code=he.status_code, content=he.detail)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
     except Exception as e:
         global_object_square_logger.logger.error(e, exc_info=True)
         output_content = get_api_output_in_standard_format(
@@ -47,10 +60,112 @@ async def insert_rows_v0(insert_rows_model: InsertRowsV0):
 @global_object_square_logger.auto_logger()
 async def get_rows_v0(get_rows_model: GetRowsV0):
     try:
-        return util_get_rows_v0(get_rows_model)
+        return await util_get_rows_v0(get_rows_model)
+    except HTTPException as he:
+        global_object_square_logger.logger.error(he, exc_info=True)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.post("/get_rows_many/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def get_rows_many_v0(get_rows_many_model: GetRowsManyV0):
+    try:
+        return await util_get_rows_many_v0(get_rows_many_model)
+    except HTTPException as he:
+        global_object_square_logger.logger.error(he, exc_info=True)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.post("/get_rows/v0/stream", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def get_rows_stream_v0(get_rows_model: GetRowsV0):
+    try:
+        return await util_get_rows_stream_v0(get_rows_model)
+    except HTTPException as he:
+        global_object_square_logger.logger.error(he, exc_info=True)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.post("/exists_rows/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def exists_rows_v0(exists_rows_model: ExistsRowsV0):
+    try:
+        return await util_exists_rows_v0(exists_rows_model)
+    except HTTPException as he:
+        global_object_square_logger.logger.error(he, exc_info=True)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.post("/count_rows/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def count_rows_v0(count_rows_model: CountRowsV0):
+    try:
+        return await util_count_rows_v0(count_rows_model)
+    except HTTPException as he:
+        global_object_square_logger.logger.error(he, exc_info=True)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.post("/aggregate_rows/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def aggregate_rows_v0(aggregate_rows_model: AggregateRowsV0):
+    try:
+        return await util_aggregate_rows_v0(aggregate_rows_model)
     except HTTPException as he:
         global_object_square_logger.logger.error(he, exc_info=True)
-        return JSONResponse(status_code=he.status_code, content=he.detail)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
     except Exception as e:
         global_object_square_logger.logger.error(e, exc_info=True)
         output_content = get_api_output_in_standard_format(
@@ -65,10 +180,12 @@ async def get_rows_v0(get_rows_model: GetRowsV0):
 @global_object_square_logger.auto_logger()
 async def edit_rows_v0(edit_rows_model: EditRowsV0):
     try:
-        return util_edit_rows_v0(edit_rows_model)
+        return await util_edit_rows_v0(edit_rows_model)
     except HTTPException as he:
         global_object_square_logger.logger.error(he, exc_info=True)
-        return JSONResponse(status_code=he.status_code, content=he.detail)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
     except Exception as e:
         global_object_square_logger.logger.error(e, exc_info=True)
         output_content = get_api_output_in_standard_format(
@@ -83,10 +200,32 @@ async def edit_rows_v0(edit_rows_model: EditRowsV0):
 @global_object_square_logger.auto_logger()
 async def delete_rows_v0(delete_rows_model: DeleteRowsV0):
     try:
-        return util_delete_rows_v0(delete_rows_model)
+        return await util_delete_rows_v0(delete_rows_model)
+    except HTTPException as he:
+        global_object_square_logger.logger.error(he, exc_info=True)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.post("/batch/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def batch_v0(batch_model: BatchV0):
+    try:
+        return await util_batch_v0(batch_model)
     except HTTPException as he:
         global_object_square_logger.logger.error(he, exc_info=True)
-        return JSONResponse(status_code=he.status_code, content=he.detail)
+        return JSONResponse(
+            status_code=he.status_code, content=he.detail, headers=he.headers
+        )
     except Exception as e:
         global_object_square_logger.logger.error(e, exc_info=True)
         output_content = get_api_output_in_standard_format(
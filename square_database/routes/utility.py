@@ -0,0 +1,94 @@
+from fastapi import status, APIRouter
+from fastapi.responses import JSONResponse
+from square_commons import get_api_output_in_standard_format
+
+from square_database.configuration import (
+    global_object_square_logger,
+)
+from square_database.messages import messages
+from square_database.utils.admission_control import get_admission_control_metrics
+from square_database.utils.database_catalog import refresh_database_catalog
+from square_database.utils.replica_routing import get_read_replica_metrics
+from square_database.utils.result_cache import get_result_cache_metrics
+from square_database.utils.single_flight import get_single_flight_metrics
+from square_database.utils.statement_cache import get_statement_cache_metrics
+from square_database.utils.warmup import get_warmup_state
+
+router = APIRouter(
+    tags=["utility"],
+)
+
+
+@router.post("/refresh_catalog/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def refresh_catalog_v0():
+    try:
+        refresh_database_catalog()
+        output_content = get_api_output_in_standard_format(
+            message=messages["CATALOG_REFRESH_SUCCESSFUL"]
+        )
+        return JSONResponse(status_code=status.HTTP_200_OK, content=output_content)
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.get("/metrics/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def metrics_v0():
+    try:
+        output_content = get_api_output_in_standard_format(
+            message=messages["READ_SUCCESSFUL"],
+            data={
+                "main": {
+                    "admission_control": get_admission_control_metrics(),
+                    "statement_cache": get_statement_cache_metrics(),
+                    "read_replicas": get_read_replica_metrics(),
+                    "result_cache": get_result_cache_metrics(),
+                    "single_flight": get_single_flight_metrics(),
+                }
+            },
+        )
+        return JSONResponse(status_code=status.HTTP_200_OK, content=output_content)
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
+
+
+@router.get("/ready/v0", status_code=status.HTTP_200_OK)
+@global_object_square_logger.auto_logger()
+async def ready_v0():
+    try:
+        local_dict_warmup_state = get_warmup_state()
+        if not local_dict_warmup_state["ready"]:
+            output_content = get_api_output_in_standard_format(
+                message=messages["SERVICE_NOT_READY"],
+                data={"main": local_dict_warmup_state},
+            )
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content=output_content,
+            )
+        output_content = get_api_output_in_standard_format(
+            message=messages["SERVICE_READY"],
+            data={"main": local_dict_warmup_state},
+        )
+        return JSONResponse(status_code=status.HTTP_200_OK, content=output_content)
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        output_content = get_api_output_in_standard_format(
+            message=messages["GENERIC_500"], log=str(e)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=output_content
+        )
@@ -0,0 +1,139 @@
+import asyncio
+import collections
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from square_commons import get_api_output_in_standard_format
+
+from square_database.configuration import (
+    config_float_admission_max_wait_seconds,
+    config_int_admission_max_concurrency_per_database,
+    config_int_admission_max_queue_per_database,
+    config_int_admission_retry_after_seconds,
+    global_object_square_logger,
+)
+from square_database.messages import messages
+
+# database_name -> admission state, see get_admission_state.
+global_dict_admission_states = {}
+
+
+def get_admission_state(database_name):
+    admission_state = global_dict_admission_states.get(database_name)
+    if admission_state is None:
+        admission_state = {
+            "active": 0,
+            "waiters": collections.deque(),
+            "admitted_count": 0,
+            "rejected_count": 0,
+            "timed_out_count": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+        global_dict_admission_states[database_name] = admission_state
+    return admission_state
+
+
+def release_admission_slot(admission_state):
+    # hand the slot straight to the oldest waiter, if any.
+    while admission_state["waiters"]:
+        waiter = admission_state["waiters"].popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+    admission_state["active"] -= 1
+
+
+def raise_database_busy(status_code, log):
+    output_content = get_api_output_in_standard_format(
+        message=messages["DATABASE_BUSY"], log=log
+    )
+    raise HTTPException(
+        status_code=status_code,
+        detail=output_content,
+        headers={"Retry-After": str(config_int_admission_retry_after_seconds)},
+    )
+
+
+@asynccontextmanager
+async def admit_database_request(database_name):
+    if config_int_admission_max_concurrency_per_database <= 0:
+        yield
+        return
+    admission_state = get_admission_state(database_name)
+    if (
+        admission_state["active"] < config_int_admission_max_concurrency_per_database
+        and not admission_state["waiters"]
+    ):
+        admission_state["active"] += 1
+    else:
+        if (
+            len(admission_state["waiters"])
+            >= config_int_admission_max_queue_per_database
+        ):
+            admission_state["rejected_count"] += 1
+            raise_database_busy(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                f"queue for database '{database_name}' is full.",
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        admission_state["waiters"].append(waiter)
+        admission_state["max_queue_depth"] = max(
+            admission_state["max_queue_depth"], len(admission_state["waiters"])
+        )
+        local_float_wait_start = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter), config_float_admission_max_wait_seconds
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we gave up, pass it on.
+                release_admission_slot(admission_state)
+            else:
+                waiter.cancel()
+                try:
+                    admission_state["waiters"].remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            admission_state["timed_out_count"] += 1
+            raise_database_busy(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                f"timed out waiting for database '{database_name}'.",
+            )
+        finally:
+            local_float_wait_seconds = time.monotonic() - local_float_wait_start
+            admission_state["total_wait_seconds"] += local_float_wait_seconds
+            admission_state["max_wait_seconds"] = max(
+                admission_state["max_wait_seconds"], local_float_wait_seconds
+            )
+    admission_state["admitted_count"] += 1
+    try:
+        yield
+    finally:
+        release_admission_slot(admission_state)
+
+
+@global_object_square_logger.auto_logger()
+def get_admission_control_metrics():
+    try:
+        return {
+            database_name: {
+                "active": admission_state["active"],
+                "queue_depth": len(admission_state["waiters"]),
+                "max_queue_depth": admission_state["max_queue_depth"],
+                "admitted_count": admission_state["admitted_count"],
+                "rejected_count": admission_state["rejected_count"],
+                "timed_out_count": admission_state["timed_out_count"],
+                "total_wait_seconds": admission_state["total_wait_seconds"],
+                "max_wait_seconds": admission_state["max_wait_seconds"],
+            }
+            for database_name, admission_state in global_dict_admission_states.items()
+        }
+    except Exception:
+        raise
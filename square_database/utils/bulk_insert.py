@@ -0,0 +1,263 @@
+import io
+import json
+import uuid
+
+from sqlalchemy import JSON, Enum, column, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.util import await_only
+
+from square_database.configuration import (
+    config_int_insert_copy_threshold,
+    config_int_insert_page_size,
+)
+from square_database.utils.common_operations import get_labeled_columns
+
+# drivers whose raw connection exposes COPY FROM STDIN.
+global_set_copy_drivers = {"psycopg2", "psycopg"}
+global_str_staging_ordinal_column_name = "square_database_staging_ordinal"
+
+# these helpers receive whole batches, they are not wrapped in auto_logger on purpose,
+# formatting 100k rows into a debug message would cost more than the insert.
+
+
+def escape_copy_text(value):
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def get_copy_value_formatter(column_type, dialect):
+    # values arrive as json primitives, render them the way postgres parses text input.
+    if isinstance(column_type, JSON):
+        return json.dumps
+    if isinstance(column_type, Enum):
+        bind_processor = column_type.dialect_impl(dialect).bind_processor(dialect)
+        if bind_processor is not None:
+            return lambda value: str(bind_processor(value))
+    return None
+
+
+def get_copy_null_text(column_type):
+    # the insert statement stores None in a JSON column as json null, not sql NULL.
+    if isinstance(column_type, JSON) and not column_type.none_as_null:
+        return "null"
+    return "\\N"
+
+
+def format_copy_value(value, value_formatter, null_text="\\N"):
+    if value is None:
+        return null_text
+    if value_formatter is not None:
+        return escape_copy_text(value_formatter(value))
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return escape_copy_text(str(value))
+
+
+def can_insert_with_copy(session, table_descriptor, rows):
+    if (
+        config_int_insert_copy_threshold <= 0
+        or len(rows) < config_int_insert_copy_threshold
+    ):
+        return False
+    dialect = session.get_bind().dialect
+    if dialect.driver not in global_set_copy_drivers:
+        return False
+    local_set_keys = set(rows[0])
+    # python side defaults are not applied by INSERT ... SELECT.
+    for column_name, table_column in table_descriptor.columns.items():
+        if column_name not in local_set_keys and table_column.default is not None:
+            return False
+    for row in rows:
+        if set(row) != local_set_keys:
+            return False
+        for key, value in row.items():
+            if isinstance(value, (dict, list)) and not isinstance(
+                table_descriptor.column_types[key], JSON
+            ):
+                return False
+    return True
+
+
+def copy_text_into_table(session, copy_sql, copy_text):
+    dialect = session.get_bind().dialect
+    driver_connection = session.connection().connection.driver_connection
+    if dialect.driver == "psycopg2":
+        with driver_connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, io.StringIO(copy_text))
+    elif dialect.is_async:
+
+        async def copy_with_async_cursor():
+            async with driver_connection.cursor() as cursor:
+                async with cursor.copy(copy_sql) as copy:
+                    await copy.write(copy_text)
+
+        # run_sync executes in a greenlet, await the driver coroutine from here.
+        await_only(copy_with_async_cursor())
+    else:
+        with driver_connection.cursor() as cursor:
+            with cursor.copy(copy_sql) as copy:
+                copy.write(copy_text)
+
+
+def apply_on_conflict(
+    stmt, table_descriptor, skip_conflicts, conflict_column_names, update_column_names
+):
+    if conflict_column_names:
+        return stmt.on_conflict_do_update(
+            index_elements=[
+                table_descriptor.columns[column_name]
+                for column_name in conflict_column_names
+            ],
+            set_={
+                table_descriptor.columns[column_name]: stmt.excluded[
+                    table_descriptor.columns[column_name].name
+                ]
+                for column_name in update_column_names
+            },
+        )
+    if skip_conflicts:
+        return stmt.on_conflict_do_nothing()
+    return stmt
+
+
+def insert_rows_with_executemany(
+    session,
+    table_descriptor,
+    rows,
+    skip_conflicts,
+    conflict_column_names,
+    update_column_names,
+):
+    # insertmanyvalues batches the rows into multi row INSERT ... RETURNING statements.
+    stmt = apply_on_conflict(
+        insert(table_descriptor.table),
+        table_descriptor,
+        skip_conflicts,
+        conflict_column_names,
+        update_column_names,
+    )
+    stmt = stmt.returning(
+        *get_labeled_columns(table_descriptor, table_descriptor.columns)
+    )
+    return session.execute(
+        stmt,
+        rows,
+        execution_options={"insertmanyvalues_page_size": config_int_insert_page_size},
+    ).all()
+
+
+def insert_rows_with_copy(
+    session,
+    table_descriptor,
+    schema_name,
+    rows,
+    skip_conflicts,
+    conflict_column_names,
+    update_column_names,
+):
+    dialect = session.get_bind().dialect
+    identifier_preparer = dialect.identifier_preparer
+    local_list_keys = list(rows[0])
+    local_list_columns = [table_descriptor.columns[key] for key in local_list_keys]
+    local_str_staging_table_name = f"square_database_staging_{uuid.uuid4().hex}"
+    local_str_column_list = ", ".join(
+        identifier_preparer.quote(table_column.name)
+        for table_column in local_list_columns
+    )
+    local_str_ordinal = identifier_preparer.quote(
+        global_str_staging_ordinal_column_name
+    )
+    # untyped copy of the target columns, no constraints or defaults on the staging side.
+    session.execute(
+        text(
+            f"CREATE TEMPORARY TABLE {local_str_staging_table_name} ON COMMIT DROP AS "
+            f"SELECT {local_str_column_list}, 0::bigint AS {local_str_ordinal} "
+            f"FROM {identifier_preparer.quote_schema(schema_name)}."
+            f"{identifier_preparer.quote(table_descriptor.table.name)} WITH NO DATA"
+        )
+    )
+    local_list_formatters = [
+        get_copy_value_formatter(table_descriptor.column_types[key], dialect)
+        for key in local_list_keys
+    ]
+    local_list_null_texts = [
+        get_copy_null_text(table_descriptor.column_types[key])
+        for key in local_list_keys
+    ]
+    copy_text = "".join(
+        "\t".join(
+            [
+                format_copy_value(row[key], value_formatter, null_text)
+                for key, value_formatter, null_text in zip(
+                    local_list_keys, local_list_formatters, local_list_null_texts
+                )
+            ]
+            + [str(ordinal)]
+        )
+        + "\n"
+        for ordinal, row in enumerate(rows)
+    )
+    copy_text_into_table(
+        session,
+        f"COPY {local_str_staging_table_name} ({local_str_column_list}, "
+        f"{local_str_ordinal}) FROM STDIN",
+        copy_text,
+    )
+    staging_table = table(
+        local_str_staging_table_name,
+        *[column(table_column.name) for table_column in local_list_columns],
+        column(global_str_staging_ordinal_column_name),
+    )
+    stmt = insert(table_descriptor.table).from_select(
+        local_list_columns,
+        select(
+            *[staging_table.c[table_column.name] for table_column in local_list_columns]
+        ).order_by(staging_table.c[global_str_staging_ordinal_column_name]),
+    )
+    stmt = apply_on_conflict(
+        stmt,
+        table_descriptor,
+        skip_conflicts,
+        conflict_column_names,
+        update_column_names,
+    )
+    stmt = stmt.returning(
+        *get_labeled_columns(table_descriptor, table_descriptor.columns)
+    )
+    inserted_rows = session.execute(stmt).all()
+    session.execute(text(f"DROP TABLE {local_str_staging_table_name}"))
+    return inserted_rows
+
+
+def insert_rows_in_bulk(
+    session,
+    table_descriptor,
+    schema_name,
+    rows,
+    skip_conflicts,
+    conflict_column_names=None,
+    update_column_names=None,
+):
+    # conflict_column_names turns the insert into an upsert of update_column_names.
+    if can_insert_with_copy(session, table_descriptor, rows):
+        return insert_rows_with_copy(
+            session,
+            table_descriptor,
+            schema_name,
+            rows,
+            skip_conflicts,
+            conflict_column_names,
+            update_column_names,
+        )
+    return insert_rows_with_executemany(
+        session,
+        table_descriptor,
+        rows,
+        skip_conflicts,
+        conflict_column_names,
+        update_column_names,
+    )
@@ -1,5 +1,25 @@
+import base64
+import datetime
+import json
+import uuid
+from decimal import Decimal
 from enum import Enum
 
+from sqlalchemy import (
+    and_,
+    bindparam,
+    false,
+    func,
+    literal,
+    not_,
+    or_,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
 from square_database.configuration import global_object_square_logger
 
 
@@ -14,15 +34,38 @@ def snake_to_capital_camel(snake_str):
         raise
 
 
+def get_column(table_descriptor, column_name):
+    column = table_descriptor.columns.get(column_name)
+    if column is None:
+        raise Exception(f"Invalid Column: {column_name}")
+    return column
+
+
+def get_labeled_columns(table_descriptor, column_names):
+    # labels keep result keys equal to attribute names, even if a column is named differently.
+    return [
+        table_descriptor.columns[column_name].label(column_name)
+        for column_name in column_names
+    ]
+
+
+def coerce_column_value(table_descriptor, column_name, value):
+    # bind proper python values so every driver sends a typed parameter.
+    value_parser = table_descriptor.column_value_parsers.get(column_name)
+    if value_parser is not None and isinstance(value, str):
+        return value_parser(value)
+    return value
+
+
 @global_object_square_logger.auto_logger()
-def apply_order_by(query, order_by, table_class):
+def apply_order_by(query, order_by, table_descriptor):
     try:
         if order_by:
             order_by_columns = [
                 (
-                    getattr(table_class, col[1:]).desc()
+                    get_column(table_descriptor, col[1:]).desc()
                     if col.startswith("-")
-                    else getattr(table_class, col).asc()
+                    else get_column(table_descriptor, col).asc()
                 )
                 for col in order_by
             ]
@@ -32,40 +75,426 @@ def apply_order_by(query, order_by, table_class):
         raise
 
 
+# operators of FilterConditionsV0, every one that is set on a column applies.
+global_tuple_filter_operators = (
+    "eq",
+    "ne",
+    "lt",
+    "lte",
+    "gt",
+    "gte",
+    "like",
+    "in_",
+    "is_null",
+)
+
+
+def get_filter_conditions(condition):
+    return [
+        (operator, getattr(condition, operator))
+        for operator in global_tuple_filter_operators
+        if getattr(condition, operator) is not None
+    ]
+
+
+def get_filter_bind_name(prefix, index, operator):
+    return f"{prefix}_{index}_{operator.rstrip('_')}"
+
+
+def get_filter_tree_children(filter_tree, prefix):
+    # (bind name prefix, child) for the nested groups of a FilterTreeV0 node.
+    return (
+        [
+            (f"{prefix}_and{index}", child)
+            for index, child in enumerate(filter_tree.and_)
+        ],
+        [
+            (f"{prefix}_or{index}", child)
+            for index, child in enumerate(filter_tree.or_ or [])
+        ],
+        (f"{prefix}_not", filter_tree.not_) if filter_tree.not_ is not None else None,
+    )
+
+
+def get_filter_clause(column, operator, bind_name, value):
+    # named bind parameters, a cached statement is re-executed with new values.
+    if operator == "is_null":
+        return column.is_(None) if value else column.is_not(None)
+    if operator == "in_":
+        return column.in_(
+            bindparam(bind_name, value, type_=column.type, expanding=True)
+        )
+    bind_parameter = bindparam(bind_name, value, type_=column.type)
+    if operator == "eq":
+        return column == bind_parameter
+    if operator == "ne":
+        return column != bind_parameter
+    if operator == "lt":
+        return column < bind_parameter
+    if operator == "lte":
+        return column <= bind_parameter
+    if operator == "gt":
+        return column > bind_parameter
+    if operator == "gte":
+        return column >= bind_parameter
+    return column.like(bind_parameter)
+
+
+def coerce_filter_value(table_descriptor, column_name, operator, value):
+    if operator == "in_":
+        return [
+            coerce_column_value(table_descriptor, column_name, item) for item in value
+        ]
+    if operator in ("like", "is_null"):
+        return value
+    return coerce_column_value(table_descriptor, column_name, value)
+
+
+def get_filters_clauses(filters_root, table_descriptor, prefix):
+    local_list_clauses = []
+    for index, (key, condition) in enumerate(filters_root.items()):
+        column = get_column(table_descriptor, key)
+        for operator, value in get_filter_conditions(condition):
+            local_list_clauses.append(
+                get_filter_clause(
+                    column,
+                    operator,
+                    get_filter_bind_name(prefix, index, operator),
+                    coerce_filter_value(table_descriptor, key, operator, value),
+                )
+            )
+    return local_list_clauses
+
+
+def get_filter_tree_clause(filter_tree, table_descriptor, prefix):
+    local_list_clauses = get_filters_clauses(
+        filter_tree.filters, table_descriptor, prefix
+    )
+    and_children, or_children, not_child = get_filter_tree_children(filter_tree, prefix)
+    if and_children:
+        local_list_clauses.append(
+            and_(
+                *[
+                    get_filter_tree_clause(child, table_descriptor, child_prefix)
+                    for child_prefix, child in and_children
+                ]
+            )
+        )
+    if filter_tree.or_ is not None:
+        # no alternatives, nothing can match.
+        local_list_clauses.append(
+            or_(
+                false(),
+                *[
+                    get_filter_tree_clause(child, table_descriptor, child_prefix)
+                    for child_prefix, child in or_children
+                ],
+            )
+        )
+    if not_child is not None:
+        local_list_clauses.append(
+            not_(get_filter_tree_clause(not_child[1], table_descriptor, not_child[0]))
+        )
+    # like empty filters, a node without any condition matches nothing.
+    if not local_list_clauses:
+        return false()
+    return and_(*local_list_clauses)
+
+
+def has_filter_tree_conditions(filter_tree):
+    if any(
+        get_filter_conditions(condition) for condition in filter_tree.filters.values()
+    ):
+        return True
+    return any(
+        has_filter_tree_conditions(child)
+        for child in [
+            *filter_tree.and_,
+            *(filter_tree.or_ or []),
+            *([filter_tree.not_] if filter_tree.not_ is not None else []),
+        ]
+    )
+
+
+def has_filter_conditions(filters_root, filter_tree=None):
+    # empty filters match nothing, a tree without a single column condition counts
+    # as empty too, so {"not_": {}} cannot turn into WHERE true.
+    return any(
+        get_filter_conditions(condition) for condition in filters_root.values()
+    ) or (filter_tree is not None and has_filter_tree_conditions(filter_tree))
+
+
 @global_object_square_logger.auto_logger()
-def apply_filters(query, filters_root, table_class):
+def apply_filters(query, filters_root, table_descriptor, filter_tree=None):
     try:
-        for key, condition in filters_root.items():
-            column = getattr(table_class, key, None)
-            if not column:
-                raise Exception(f"Invalid Column: {key}")
-
-            if condition.eq is not None:
-                query = query.where(column == condition.eq)
-            elif condition.ne is not None:
-                query = query.where(column != condition.ne)
-            elif condition.lt is not None:
-                query = query.where(column < condition.lt)
-            elif condition.lte is not None:
-                query = query.where(column <= condition.lte)
-            elif condition.gt is not None:
-                query = query.where(column > condition.gt)
-            elif condition.gte is not None:
-                query = query.where(column >= condition.gte)
-            elif condition.like is not None:
-                query = query.where(column.like(condition.like))
-            elif condition.in_ is not None:
-                query = query.where(column.in_(condition.in_))
-            elif condition.is_null is not None:
-                if condition.is_null:
-                    query = query.where(column.is_(None))
-                else:
-                    query = query.where(column.is_not(None))
+        # one WHERE clause, the column filters and the tree are ANDed.
+        for clause in get_filters_clauses(filters_root, table_descriptor, "filter"):
+            query = query.where(clause)
+        if filter_tree is not None:
+            query = query.where(
+                get_filter_tree_clause(filter_tree, table_descriptor, "tree")
+            )
         return query
     except Exception:
         raise
 
 
+def get_filters_shape(filters_root):
+    # everything that changes the statement, values only matter for is_null.
+    return tuple(
+        (
+            key,
+            tuple(
+                (operator, value if operator == "is_null" else None)
+                for operator, value in get_filter_conditions(condition)
+            ),
+        )
+        for key, condition in filters_root.items()
+    )
+
+
+def get_filter_tree_shape(filter_tree):
+    return (
+        get_filters_shape(filter_tree.filters),
+        tuple(get_filter_tree_shape(child) for child in filter_tree.and_),
+        (
+            tuple(get_filter_tree_shape(child) for child in filter_tree.or_)
+            if filter_tree.or_ is not None
+            else None
+        ),
+        (
+            get_filter_tree_shape(filter_tree.not_)
+            if filter_tree.not_ is not None
+            else None
+        ),
+    )
+
+
+def get_filter_shape(filters_root, filter_tree=None):
+    return (
+        get_filters_shape(filters_root),
+        get_filter_tree_shape(filter_tree) if filter_tree is not None else None,
+    )
+
+
+def add_filters_parameters(parameters, filters_root, table_descriptor, prefix):
+    for index, (key, condition) in enumerate(filters_root.items()):
+        for operator, value in get_filter_conditions(condition):
+            if operator != "is_null":
+                parameters[get_filter_bind_name(prefix, index, operator)] = (
+                    coerce_filter_value(table_descriptor, key, operator, value)
+                )
+
+
+def add_filter_tree_parameters(parameters, filter_tree, table_descriptor, prefix):
+    add_filters_parameters(parameters, filter_tree.filters, table_descriptor, prefix)
+    and_children, or_children, not_child = get_filter_tree_children(filter_tree, prefix)
+    for child_prefix, child in (
+        and_children + or_children + ([not_child] if not_child is not None else [])
+    ):
+        add_filter_tree_parameters(parameters, child, table_descriptor, child_prefix)
+
+
+def get_filter_parameters(filters_root, table_descriptor, filter_tree=None):
+    # bind values for a statement built by apply_filters from the same filter shape.
+    local_dict_parameters = {}
+    add_filters_parameters(
+        local_dict_parameters, filters_root, table_descriptor, "filter"
+    )
+    if filter_tree is not None:
+        add_filter_tree_parameters(
+            local_dict_parameters, filter_tree, table_descriptor, "tree"
+        )
+    return local_dict_parameters
+
+
+@global_object_square_logger.auto_logger()
+def get_cursor_order_by(order_by, table_descriptor):
+    try:
+        # the primary key makes the ordering total, so every row has one position.
+        local_set_order_by_column_names = {col.lstrip("-") for col in order_by}
+        return list(order_by) + [
+            column_name
+            for column_name in table_descriptor.primary_key_column_names
+            if column_name not in local_set_order_by_column_names
+        ]
+    except Exception:
+        raise
+
+
+def encode_cursor_value(value):
+    if isinstance(value, Enum):
+        return {"enum": value.name}
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return {"iso": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    if isinstance(value, uuid.UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    return {"value": value}
+
+
+def decode_cursor_value(encoded_value):
+    if "decimal" in encoded_value:
+        return Decimal(encoded_value["decimal"])
+    if "uuid" in encoded_value:
+        return uuid.UUID(encoded_value["uuid"])
+    if "bytes" in encoded_value:
+        return bytes.fromhex(encoded_value["bytes"])
+    # enum names and iso strings are bound as is / parsed per column.
+    return next(iter(encoded_value.values()))
+
+
+@global_object_square_logger.auto_logger()
+def encode_cursor(order_by, row_values):
+    try:
+        local_str_payload = json.dumps(
+            {
+                "order_by": order_by,
+                "values": [encode_cursor_value(value) for value in row_values],
+            },
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(local_str_payload.encode()).decode()
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def decode_cursor(cursor, order_by, table_descriptor):
+    try:
+        try:
+            local_dict_payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise Exception("Invalid cursor.")
+        if local_dict_payload.get("order_by") != order_by or len(
+            local_dict_payload.get("values", [])
+        ) != len(order_by):
+            raise Exception("Cursor does not match the requested order_by.")
+        return [
+            coerce_column_value(
+                table_descriptor, col.lstrip("-"), decode_cursor_value(encoded_value)
+            )
+            for col, encoded_value in zip(order_by, local_dict_payload["values"])
+        ]
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def apply_cursor(query, order_by, cursor_values, table_descriptor):
+    try:
+        local_list_columns = [
+            get_column(table_descriptor, col.lstrip("-")) for col in order_by
+        ]
+        local_list_descending = [col.startswith("-") for col in order_by]
+        if (
+            len(set(local_list_descending)) == 1
+            and None not in cursor_values
+            and all(
+                col.lstrip("-") in table_descriptor.non_nullable_column_names
+                for col in order_by
+            )
+        ):
+            # single direction over non null columns: (k1, k2) > (v1, v2) can use an index.
+            local_object_values = tuple_(
+                *[
+                    literal(value, column.type)
+                    for column, value in zip(local_list_columns, cursor_values)
+                ]
+            )
+            if local_list_descending[0]:
+                return query.where(tuple_(*local_list_columns) < local_object_values)
+            return query.where(tuple_(*local_list_columns) > local_object_values)
+        # general form, postgres sorts nulls last for asc and first for desc.
+        local_list_conditions = []
+        for index, (column, descending, value) in enumerate(
+            zip(local_list_columns, local_list_descending, cursor_values)
+        ):
+            # typed binds, sqlalchemy refuses < and > against python booleans.
+            bound_value = literal(value, column.type)
+            if descending:
+                after = column.is_not(None) if value is None else column < bound_value
+            else:
+                after = (
+                    false()
+                    if value is None
+                    else or_(column > bound_value, column.is_(None))
+                )
+            local_list_conditions.append(
+                and_(
+                    *[
+                        (
+                            previous_column.is_(None)
+                            if previous_value is None
+                            else previous_column == previous_value
+                        )
+                        for previous_column, previous_value in zip(
+                            local_list_columns[:index], cursor_values[:index]
+                        )
+                    ],
+                    after,
+                )
+            )
+        return query.where(or_(*local_list_conditions))
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def get_exact_count(session, statement, parameters=None):
+    try:
+        return session.execute(
+            select(func.count()).select_from(statement.order_by(None).subquery()),
+            parameters,
+        ).scalar_one()
+    except Exception:
+        raise
+
+
+class ExplainStatement(Executable, ClauseElement):
+    # EXPLAIN (FORMAT JSON) wrapper that keeps bind parameters and schema translation.
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainStatement, "postgresql")
+def compile_explain_statement(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@global_object_square_logger.auto_logger()
+def get_estimated_count(
+    session, statement, schema_name, table_descriptor, filtered, parameters=None
+):
+    try:
+        if not filtered:
+            # planner statistics for the whole table, -1 until the table is analyzed.
+            reltuples = session.execute(
+                text(
+                    "SELECT c.reltuples FROM pg_class c "
+                    "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                    "WHERE n.nspname = :schema_name AND c.relname = :table_name"
+                ),
+                {
+                    "schema_name": schema_name,
+                    "table_name": table_descriptor.table.name,
+                },
+            ).scalar()
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+        query_plan = session.execute(ExplainStatement(statement), parameters).scalar()
+        if isinstance(query_plan, str):
+            query_plan = json.loads(query_plan)
+        return int(query_plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        raise
+
+
 def enum_fallback_serializer(obj):
     if isinstance(obj, Enum):
         return obj.value
@@ -0,0 +1,176 @@
+import threading
+import time
+
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from sqlalchemy import text
+from square_commons import get_api_output_in_standard_format
+
+from square_database.configuration import (
+    config_int_admission_retry_after_seconds,
+    config_int_catalog_ttl_seconds,
+    config_str_db_maintenance_database_name,
+    global_object_square_logger,
+)
+from square_database.messages import messages
+from square_database.utils.database_engines import dispose_database_engine
+from square_database.utils.database_execution import (
+    run_blocking,
+    run_database_operation,
+)
+from square_database.utils.single_flight import run_single_flight
+
+# {"names": frozenset of database names, "loaded_at": monotonic timestamp}
+global_dict_database_catalog = {"names": None, "loaded_at": 0.0}
+# database_name -> {"names": frozenset of schema names, "loaded_at": monotonic timestamp}
+global_dict_schema_catalog = {}
+global_object_catalog_lock = threading.Lock()
+
+
+def is_catalog_entry_fresh(catalog_entry):
+    return (
+        catalog_entry is not None
+        and catalog_entry["names"] is not None
+        and time.monotonic() - catalog_entry["loaded_at"]
+        < config_int_catalog_ttl_seconds
+    )
+
+
+def load_database_names(session):
+    return frozenset(
+        session.execute(
+            text(
+                "SELECT datname FROM pg_database "
+                "WHERE datallowconn AND NOT datistemplate"
+            )
+        ).scalars()
+    )
+
+
+def load_schema_names(session):
+    return frozenset(
+        session.execute(
+            text("SELECT schema_name FROM information_schema.schemata")
+        ).scalars()
+    )
+
+
+@global_object_square_logger.auto_logger()
+async def get_database_names(force_reload=False):
+    try:
+        if not force_reload and is_catalog_entry_fresh(global_dict_database_catalog):
+            return global_dict_database_catalog["names"]
+
+        async def reload_database_names():
+            # through the engine kind in use, a database never gets a second pool.
+            local_set_database_names = await run_database_operation(
+                config_str_db_maintenance_database_name, {}, load_database_names
+            )
+            with global_object_catalog_lock:
+                global_dict_database_catalog["names"] = local_set_database_names
+                global_dict_database_catalog["loaded_at"] = time.monotonic()
+            return local_set_database_names
+
+        # requests arriving while the names are reloaded wait for the same query.
+        return await run_single_flight(("database_catalog",), reload_database_names)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def get_schema_names(database_name):
+    try:
+        catalog_entry = global_dict_schema_catalog.get(database_name)
+        if is_catalog_entry_fresh(catalog_entry):
+            return catalog_entry["names"]
+
+        async def reload_schema_names():
+            local_set_schema_names = await run_database_operation(
+                database_name, {}, load_schema_names
+            )
+            with global_object_catalog_lock:
+                global_dict_schema_catalog[database_name] = {
+                    "names": local_set_schema_names,
+                    "loaded_at": time.monotonic(),
+                }
+            return local_set_schema_names
+
+        return await run_single_flight(
+            ("schema_catalog", database_name), reload_schema_names
+        )
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def refresh_database_catalog(database_name=None):
+    try:
+        with global_object_catalog_lock:
+            if database_name is None:
+                global_dict_database_catalog["names"] = None
+                global_dict_schema_catalog.clear()
+            else:
+                global_dict_schema_catalog.pop(database_name, None)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def validate_database_and_schema_name(database_name, schema_name):
+    try:
+        local_set_database_names = await get_database_names()
+        if database_name not in local_set_database_names:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_DATABASE_NAME"],
+                log=f"database '{database_name}' does not exist.",
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+        local_set_schema_names = await get_schema_names(database_name)
+        if schema_name not in local_set_schema_names:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_SCHEMA_NAME"]
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def get_operational_error(database_name, operational_error):
+    # connection errors also come from overload, failover or timeouts, only a database
+    # that is really gone loses its pool and catalog entry.
+    try:
+        global_object_square_logger.logger.error(operational_error, exc_info=True)
+        try:
+            local_bool_database_exists = database_name in await get_database_names(True)
+        except Exception as e:
+            global_object_square_logger.logger.warning(
+                f"could not check whether database '{database_name}' exists: {e}"
+            )
+            local_bool_database_exists = True
+        if not local_bool_database_exists:
+            refresh_database_catalog(database_name)
+            await run_blocking(dispose_database_engine, database_name)
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_DATABASE_NAME"], log=str(operational_error)
+            )
+            return HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+        output_content = get_api_output_in_standard_format(
+            message=messages["DATABASE_UNAVAILABLE"], log=str(operational_error)
+        )
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=output_content,
+            headers={"Retry-After": str(config_int_admission_retry_after_seconds)},
+        )
+    except Exception:
+        raise
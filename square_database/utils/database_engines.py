@@ -0,0 +1,189 @@
+import math
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from square_database.configuration import (
+    config_bool_db_pool_pre_ping,
+    config_int_db_max_overflow,
+    config_int_db_pool_recycle,
+    config_int_db_pool_size,
+    config_int_db_pool_timeout,
+    config_float_replica_check_timeout_seconds,
+    config_int_db_port,
+    config_str_db_ip,
+    config_str_db_password,
+    config_str_db_username,
+    config_str_async_db_driver,
+    global_object_square_logger,
+)
+
+# one engine (and therefore one connection pool) per database, created lazily.
+global_dict_database_engines = {}
+global_dict_async_database_engines = {}
+# (database_name, replica) -> engine, replica is "host:port" from DB_REPLICAS.
+global_dict_replica_database_engines = {}
+global_dict_async_replica_database_engines = {}
+global_object_database_engines_lock = threading.Lock()
+
+
+def get_database_url(database_name, driver_name=None, replica=None):
+    local_str_dialect = (
+        f"postgresql+{driver_name}" if driver_name is not None else "postgresql"
+    )
+    local_str_host = (
+        f"{config_str_db_ip}:{str(config_int_db_port)}" if replica is None else replica
+    )
+    return (
+        f"{local_str_dialect}://{config_str_db_username}:{config_str_db_password}@"
+        f"{local_str_host}/{database_name}"
+    )
+
+
+def get_engine_registry(database_name, replica, is_async):
+    # the dictionary holding the engine and its key in that dictionary.
+    if replica is None:
+        return (
+            global_dict_async_database_engines
+            if is_async
+            else global_dict_database_engines
+        ), database_name
+    return (
+        global_dict_async_replica_database_engines
+        if is_async
+        else global_dict_replica_database_engines
+    ), (database_name, replica)
+
+
+def get_pool_options():
+    return {
+        "pool_size": config_int_db_pool_size,
+        "max_overflow": config_int_db_max_overflow,
+        "pool_recycle": config_int_db_pool_recycle,
+        "pool_pre_ping": config_bool_db_pool_pre_ping,
+        "pool_timeout": config_int_db_pool_timeout,
+    }
+
+
+def get_connect_args(replica, driver_name=None):
+    # a replica that silently drops packets must fail fast, not after the os timeout.
+    if replica is None:
+        return {}
+    if driver_name == "asyncpg":
+        return {"timeout": config_float_replica_check_timeout_seconds}
+    # libpq only takes whole seconds.
+    return {
+        "connect_timeout": max(1, math.ceil(config_float_replica_check_timeout_seconds))
+    }
+
+
+@global_object_square_logger.auto_logger()
+def get_database_engine(database_name, replica=None):
+    try:
+        local_dict_engines, local_object_key = get_engine_registry(
+            database_name, replica, False
+        )
+        database_engine = local_dict_engines.get(local_object_key)
+        if database_engine is not None:
+            return database_engine
+        with global_object_database_engines_lock:
+            # another thread may have created it while we were waiting.
+            database_engine = local_dict_engines.get(local_object_key)
+            if database_engine is None:
+                database_engine = create_engine(
+                    get_database_url(database_name, replica=replica),
+                    connect_args=get_connect_args(replica),
+                    **get_pool_options(),
+                )
+                local_dict_engines[local_object_key] = database_engine
+        return database_engine
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def get_async_database_engine(database_name, replica=None):
+    try:
+        local_dict_engines, local_object_key = get_engine_registry(
+            database_name, replica, True
+        )
+        async_database_engine = local_dict_engines.get(local_object_key)
+        if async_database_engine is not None:
+            return async_database_engine
+        with global_object_database_engines_lock:
+            async_database_engine = local_dict_engines.get(local_object_key)
+            if async_database_engine is None:
+                async_database_engine = create_async_engine(
+                    get_database_url(
+                        database_name, config_str_async_db_driver, replica
+                    ),
+                    connect_args=get_connect_args(replica, config_str_async_db_driver),
+                    **get_pool_options(),
+                )
+                local_dict_engines[local_object_key] = async_database_engine
+        return async_database_engine
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def dispose_database_engine(database_name, replica=None):
+    try:
+        local_list_database_engines = []
+        local_list_async_database_engines = []
+        with global_object_database_engines_lock:
+            if replica is None:
+                # the replica engines of the database go together with the primary.
+                local_list_replicas = [None] + sorted(
+                    {
+                        key[1]
+                        for key in [
+                            *global_dict_replica_database_engines,
+                            *global_dict_async_replica_database_engines,
+                        ]
+                        if key[0] == database_name
+                    }
+                )
+            else:
+                local_list_replicas = [replica]
+            for local_str_replica in local_list_replicas:
+                for is_async, local_list_engines in (
+                    (False, local_list_database_engines),
+                    (True, local_list_async_database_engines),
+                ):
+                    local_dict_engines, local_object_key = get_engine_registry(
+                        database_name, local_str_replica, is_async
+                    )
+                    database_engine = local_dict_engines.pop(local_object_key, None)
+                    if database_engine is not None:
+                        local_list_engines.append(database_engine)
+        for database_engine in local_list_database_engines:
+            database_engine.dispose()
+        for async_database_engine in local_list_async_database_engines:
+            # async connections can only be closed on the loop, just let them go.
+            async_database_engine.sync_engine.dispose(close=False)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def dispose_all_database_engines():
+    try:
+        with global_object_database_engines_lock:
+            local_list_database_engines = list(
+                global_dict_database_engines.values()
+            ) + list(global_dict_replica_database_engines.values())
+            global_dict_database_engines.clear()
+            global_dict_replica_database_engines.clear()
+            local_list_async_database_engines = list(
+                global_dict_async_database_engines.values()
+            ) + list(global_dict_async_replica_database_engines.values())
+            global_dict_async_database_engines.clear()
+            global_dict_async_replica_database_engines.clear()
+        for database_engine in local_list_database_engines:
+            database_engine.dispose()
+        for async_database_engine in local_list_async_database_engines:
+            await async_database_engine.dispose()
+    except Exception:
+        raise
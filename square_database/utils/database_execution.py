@@ -0,0 +1,133 @@
+import functools
+
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from square_database.configuration import (
+    config_bool_enable_async_driver,
+    config_int_db_thread_pool_size,
+    config_int_stream_chunk_size,
+    global_object_square_logger,
+)
+from square_database.utils.admission_control import admit_database_request
+from square_database.utils.database_engines import (
+    get_async_database_engine,
+    get_database_engine,
+)
+
+# bounds how many blocking database calls can run at the same time.
+global_object_thread_limiter = anyio.CapacityLimiter(config_int_db_thread_pool_size)
+
+
+async def run_blocking(function, *args, **kwargs):
+    return await anyio.to_thread.run_sync(
+        functools.partial(function, *args, **kwargs),
+        limiter=global_object_thread_limiter,
+    )
+
+
+def run_operation_in_session(session, schema_translate_map, operation):
+    # target the requested schema on the connection the session actually uses.
+    session.connection(execution_options={"schema_translate_map": schema_translate_map})
+    return operation(session)
+
+
+def run_operation_in_new_session(
+    database_name, schema_translate_map, operation, replica=None
+):
+    local_object_session = sessionmaker(
+        bind=get_database_engine(database_name, replica)
+    )
+    with local_object_session() as session:
+        return run_operation_in_session(session, schema_translate_map, operation)
+
+
+@global_object_square_logger.auto_logger()
+async def run_database_operation(
+    database_name, schema_translate_map, operation, replica=None
+):
+    try:
+        async with admit_database_request(database_name):
+            # operation(session) is plain sync sqlalchemy code, it runs either on the
+            # async engine through run_sync or on the sync engine in the thread pool.
+            if config_bool_enable_async_driver:
+                async with AsyncSession(
+                    get_async_database_engine(database_name, replica)
+                ) as async_session:
+                    return await async_session.run_sync(
+                        run_operation_in_session, schema_translate_map, operation
+                    )
+            return await run_blocking(
+                run_operation_in_new_session,
+                database_name,
+                schema_translate_map,
+                operation,
+                replica,
+            )
+    except Exception:
+        raise
+
+
+def start_streaming_result(
+    database_name, schema_translate_map, statement, replica=None
+):
+    database_connection = get_database_engine(database_name, replica).connect()
+    try:
+        database_connection = database_connection.execution_options(
+            schema_translate_map=schema_translate_map,
+            stream_results=True,
+            yield_per=config_int_stream_chunk_size,
+        )
+        return database_connection, database_connection.execute(statement)
+    except Exception:
+        database_connection.close()
+        raise
+
+
+async def close_database_connection(database_connection):
+    # runs even when the client went away and the stream was cancelled.
+    with anyio.CancelScope(shield=True):
+        if config_bool_enable_async_driver:
+            await database_connection.close()
+        else:
+            await run_blocking(database_connection.close)
+
+
+async def stream_database_rows(
+    database_name, schema_translate_map, statement, replica=None
+):
+    # server side cursor, at most config_int_stream_chunk_size rows are held at once.
+    async with admit_database_request(database_name):
+        if config_bool_enable_async_driver:
+            database_connection = await get_async_database_engine(
+                database_name, replica
+            ).connect()
+            try:
+                await database_connection.execution_options(
+                    schema_translate_map=schema_translate_map,
+                    yield_per=config_int_stream_chunk_size,
+                )
+                async_result = await database_connection.stream(statement)
+                async for partition in async_result.partitions():
+                    yield partition
+            finally:
+                await close_database_connection(database_connection)
+        else:
+            database_connection, result = await run_blocking(
+                start_streaming_result,
+                database_name,
+                schema_translate_map,
+                statement,
+                replica,
+            )
+            try:
+                while True:
+                    partition = await run_blocking(
+                        result.fetchmany, config_int_stream_chunk_size
+                    )
+                    if not partition:
+                        break
+                    yield partition
+            finally:
+                await close_database_connection(database_connection)
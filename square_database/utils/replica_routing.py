@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import time
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from square_database.configuration import (
+    config_bool_enable_async_driver,
+    config_float_replica_check_interval_seconds,
+    config_float_replica_check_timeout_seconds,
+    config_float_replica_max_lag_seconds,
+    config_list_db_replicas,
+    global_object_square_logger,
+)
+from square_database.utils.database_engines import (
+    dispose_database_engine,
+    get_async_database_engine,
+    get_database_engine,
+)
+from square_database.utils.database_execution import (
+    run_blocking,
+    run_database_operation,
+)
+
+# replica ("host:port") -> routing state, see get_replica_state.
+global_dict_replica_states = {}
+global_object_replica_counter = itertools.count()
+# running background checks, referenced so they are not garbage collected.
+global_set_replica_check_tasks = set()
+
+# seconds since the last replayed transaction, 0 when nothing is waiting to be replayed
+# (an idle primary would otherwise look like growing lag) or on a primary.
+global_object_replica_lag_statement = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE("
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0"
+    ") END"
+)
+
+
+def get_replica_state(replica):
+    replica_state = global_dict_replica_states.get(replica)
+    if replica_state is None:
+        replica_state = {
+            "healthy": False,
+            "checking": False,
+            "lag_seconds": None,
+            "checked_at": float("-inf"),
+            "last_error": None,
+            "routed_count": 0,
+            "ejected_count": 0,
+        }
+        global_dict_replica_states[replica] = replica_state
+    return replica_state
+
+
+def get_replica_timeout_statement():
+    # local to the transaction of the check, the pooled connection keeps its default.
+    return select(
+        func.set_config(
+            "statement_timeout",
+            str(int(config_float_replica_check_timeout_seconds * 1000)),
+            True,
+        )
+    )
+
+
+def get_replica_lag_seconds(database_name, replica):
+    with get_database_engine(database_name, replica).connect() as database_connection:
+        database_connection.execute(get_replica_timeout_statement())
+        return float(
+            database_connection.execute(global_object_replica_lag_statement).scalar()
+        )
+
+
+async def get_async_replica_lag_seconds(database_name, replica):
+    async with get_async_database_engine(
+        database_name, replica
+    ).connect() as database_connection:
+        await database_connection.execute(get_replica_timeout_statement())
+        return float(
+            (
+                await database_connection.execute(global_object_replica_lag_statement)
+            ).scalar()
+        )
+
+
+def mark_replica_unhealthy(replica_state, reason):
+    if replica_state["healthy"]:
+        replica_state["ejected_count"] += 1
+    replica_state["healthy"] = False
+    replica_state["last_error"] = reason
+
+
+async def check_read_replica(database_name, replica):
+    replica_state = get_replica_state(replica)
+    try:
+        # the same engine kind as the reads, a replica never gets a second pool.
+        if config_bool_enable_async_driver:
+            local_float_lag_seconds = await asyncio.wait_for(
+                get_async_replica_lag_seconds(database_name, replica),
+                config_float_replica_check_timeout_seconds,
+            )
+        else:
+            # bounded by the connect and statement timeouts of the check.
+            local_float_lag_seconds = await run_blocking(
+                get_replica_lag_seconds, database_name, replica
+            )
+    except Exception as e:
+        global_object_square_logger.logger.warning(
+            f"read replica '{replica}' is unreachable: {e!r}"
+        )
+        mark_replica_unhealthy(replica_state, repr(e))
+        return
+    finally:
+        replica_state["checking"] = False
+    replica_state["lag_seconds"] = local_float_lag_seconds
+    if local_float_lag_seconds > config_float_replica_max_lag_seconds:
+        global_object_square_logger.logger.warning(
+            f"read replica '{replica}' is {local_float_lag_seconds}s behind, ejected."
+        )
+        mark_replica_unhealthy(
+            replica_state,
+            f"replication lag of {local_float_lag_seconds}s is above "
+            f"{config_float_replica_max_lag_seconds}s.",
+        )
+    else:
+        replica_state["healthy"] = True
+        replica_state["last_error"] = None
+
+
+def schedule_read_replica_check(database_name, replica):
+    replica_state = get_replica_state(replica)
+    # at most one check per replica, a hanging one does not pile up more.
+    if (
+        replica_state["checking"]
+        or time.monotonic() - replica_state["checked_at"]
+        < config_float_replica_check_interval_seconds
+    ):
+        return
+    replica_state["checking"] = True
+    replica_state["checked_at"] = time.monotonic()
+    check_task = asyncio.ensure_future(check_read_replica(database_name, replica))
+    global_set_replica_check_tasks.add(check_task)
+    check_task.add_done_callback(global_set_replica_check_tasks.discard)
+
+
+@global_object_square_logger.auto_logger()
+async def choose_read_replica(database_name, consistency):
+    try:
+        if consistency == "primary" or not config_list_db_replicas:
+            return None
+        # checks run in the background, requests only read their last result.
+        for replica in config_list_db_replicas:
+            schedule_read_replica_check(database_name, replica)
+        local_list_healthy_replicas = [
+            replica
+            for replica in config_list_db_replicas
+            if get_replica_state(replica)["healthy"]
+        ]
+        if not local_list_healthy_replicas:
+            # no usable replica, the primary serves the read.
+            return None
+        replica = local_list_healthy_replicas[
+            next(global_object_replica_counter) % len(local_list_healthy_replicas)
+        ]
+        get_replica_state(replica)["routed_count"] += 1
+        return replica
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def eject_read_replica(database_name, replica, error):
+    try:
+        global_object_square_logger.logger.warning(
+            f"read replica '{replica}' failed, ejected: {error}"
+        )
+        mark_replica_unhealthy(get_replica_state(replica), str(error))
+        # closing pooled connections blocks, keep it off the event loop.
+        await run_blocking(dispose_database_engine, database_name, replica)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def run_read_operation(
+    database_name, schema_translate_map, operation, consistency
+):
+    try:
+        replica = await choose_read_replica(database_name, consistency)
+        if replica is not None:
+            try:
+                return await run_database_operation(
+                    database_name, schema_translate_map, operation, replica
+                )
+            except OperationalError as oe:
+                # the replica went away since its last check, read from the primary.
+                await eject_read_replica(database_name, replica, oe)
+        return await run_database_operation(
+            database_name, schema_translate_map, operation
+        )
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def get_read_replica_metrics():
+    try:
+        return {
+            replica: {
+                "healthy": replica_state["healthy"],
+                "lag_seconds": replica_state["lag_seconds"],
+                "last_error": replica_state["last_error"],
+                "routed_count": replica_state["routed_count"],
+                "ejected_count": replica_state["ejected_count"],
+            }
+            for replica, replica_state in global_dict_replica_states.items()
+        }
+    except Exception:
+        raise
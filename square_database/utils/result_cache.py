@@ -0,0 +1,141 @@
+import collections
+import time
+
+from square_database.configuration import (
+    config_float_result_cache_ttl_seconds,
+    config_int_result_cache_max_bytes,
+    config_list_result_cache_excluded_tables,
+    config_list_result_cache_tables,
+    global_object_square_logger,
+)
+from square_database.utils.serialization import dump_json
+
+# request key -> (expires_at, table key, response body), least recently used first.
+# only touched from the event loop, no lock needed.
+global_dict_result_cache = collections.OrderedDict()
+# (database_name, schema_name, table_name) -> request keys cached for that table.
+global_dict_result_cache_table_keys = collections.defaultdict(set)
+# (database_name, schema_name, table_name) -> bumped on every write to the table.
+global_dict_result_cache_table_versions = collections.defaultdict(int)
+global_dict_result_cache_counters = {
+    "size_bytes": 0,
+    "hit_count": 0,
+    "miss_count": 0,
+    "eviction_count": 0,
+    "expired_count": 0,
+    "invalidation_count": 0,
+}
+
+
+def is_result_cache_enabled(database_name, schema_name, table_name):
+    if config_int_result_cache_max_bytes <= 0:
+        return False
+    local_str_table = f"{database_name}.{schema_name}.{table_name}"
+    if local_str_table in config_list_result_cache_excluded_tables:
+        return False
+    return (
+        not config_list_result_cache_tables
+        or local_str_table in config_list_result_cache_tables
+    )
+
+
+def get_result_cache_key(get_rows_model):
+    # routing does not change the result, consistency is left out of the key.
+    return dump_json(
+        get_rows_model.model_dump(mode="json", exclude={"consistency"}),
+        sort_keys=True,
+    )
+
+
+def remove_cached_result(result_key):
+    cached_result = global_dict_result_cache.pop(result_key, None)
+    if cached_result is None:
+        return
+    _, table_key, body = cached_result
+    local_set_result_keys = global_dict_result_cache_table_keys.get(table_key)
+    if local_set_result_keys is not None:
+        local_set_result_keys.discard(result_key)
+        if not local_set_result_keys:
+            del global_dict_result_cache_table_keys[table_key]
+    global_dict_result_cache_counters["size_bytes"] -= len(body)
+
+
+def get_result_cache_version(table_key):
+    return global_dict_result_cache_table_versions[table_key]
+
+
+# the helpers below receive whole response bodies, they are not wrapped in auto_logger.
+def get_cached_result(result_key):
+    cached_result = global_dict_result_cache.get(result_key)
+    if cached_result is None:
+        global_dict_result_cache_counters["miss_count"] += 1
+        return None
+    if cached_result[0] <= time.monotonic():
+        remove_cached_result(result_key)
+        global_dict_result_cache_counters["expired_count"] += 1
+        global_dict_result_cache_counters["miss_count"] += 1
+        return None
+    global_dict_result_cache.move_to_end(result_key)
+    global_dict_result_cache_counters["hit_count"] += 1
+    return cached_result[2]
+
+
+def store_cached_result(result_key, table_key, version, body):
+    # a write finished while the query ran, its result may already be stale.
+    if version != global_dict_result_cache_table_versions[table_key]:
+        return
+    if len(body) > config_int_result_cache_max_bytes:
+        return
+    if result_key in global_dict_result_cache:
+        remove_cached_result(result_key)
+    while (
+        global_dict_result_cache_counters["size_bytes"] + len(body)
+        > config_int_result_cache_max_bytes
+    ):
+        remove_cached_result(next(iter(global_dict_result_cache)))
+        global_dict_result_cache_counters["eviction_count"] += 1
+    global_dict_result_cache[result_key] = (
+        time.monotonic() + config_float_result_cache_ttl_seconds,
+        table_key,
+        body,
+    )
+    global_dict_result_cache_table_keys[table_key].add(result_key)
+    global_dict_result_cache_counters["size_bytes"] += len(body)
+
+
+@global_object_square_logger.auto_logger()
+def invalidate_cached_results(database_name, schema_name, table_name):
+    # runs after the write has committed, it must not turn it into an error response.
+    try:
+        table_key = (database_name, schema_name, table_name)
+        global_dict_result_cache_table_versions[table_key] += 1
+        for result_key in list(global_dict_result_cache_table_keys.get(table_key, ())):
+            remove_cached_result(result_key)
+            global_dict_result_cache_counters["invalidation_count"] += 1
+    except Exception as e:
+        global_object_square_logger.logger.error(e, exc_info=True)
+        # the table index cannot be trusted anymore, drop every cached result.
+        global_dict_result_cache.clear()
+        global_dict_result_cache_table_keys.clear()
+        global_dict_result_cache_counters["size_bytes"] = 0
+
+
+@global_object_square_logger.auto_logger()
+def get_result_cache_metrics():
+    try:
+        local_int_lookup_count = (
+            global_dict_result_cache_counters["hit_count"]
+            + global_dict_result_cache_counters["miss_count"]
+        )
+        return {
+            "size": len(global_dict_result_cache),
+            "max_size_bytes": config_int_result_cache_max_bytes,
+            **global_dict_result_cache_counters,
+            "hit_rate": (
+                global_dict_result_cache_counters["hit_count"] / local_int_lookup_count
+                if local_int_lookup_count
+                else None
+            ),
+        }
+    except Exception:
+        raise
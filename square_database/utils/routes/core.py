@@ -1,257 +1,447 @@
-import importlib
-import json
+import asyncio
 
 from fastapi import status
 from fastapi.exceptions import HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy import create_engine, text, inspect
-from sqlalchemy.dialects.postgresql import insert
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    Numeric,
+    bindparam,
+    cast,
+    delete,
+    distinct,
+    false,
+    func,
+    literal_column,
+    select,
+    update,
+)
 from sqlalchemy.exc import OperationalError
-from sqlalchemy.orm import sessionmaker
 from square_commons import get_api_output_in_standard_format
 
 from square_database.configuration import (
-    config_int_db_port,
-    config_str_database_module_name,
-    config_str_db_ip,
-    config_str_db_password,
-    config_str_db_username,
+    config_bool_enable_single_flight,
+    config_int_get_rows_many_max_concurrency,
+    config_int_get_rows_many_statement_timeout_milliseconds,
     global_object_square_logger,
 )
 from square_database.messages import messages
+from square_database.utils.bulk_insert import insert_rows_in_bulk
 from square_database.utils.common_operations import (
-    snake_to_capital_camel,
-    enum_fallback_serializer,
+    apply_cursor,
+    coerce_column_value,
+    decode_cursor,
+    encode_cursor,
+    get_cursor_order_by,
+    get_estimated_count,
+    get_exact_count,
+    get_filter_bind_name,
+    get_filter_clause,
+    get_filter_conditions,
+    get_filter_parameters,
+    get_filter_shape,
+    get_labeled_columns,
+    has_filter_conditions,
     apply_filters,
     apply_order_by,
 )
+from square_database.utils.database_catalog import (
+    get_operational_error,
+    validate_database_and_schema_name,
+)
+from square_database.utils.database_execution import (
+    run_database_operation,
+    stream_database_rows,
+)
+from square_database.utils.replica_routing import (
+    choose_read_replica,
+    eject_read_replica,
+    run_read_operation,
+)
+from square_database.utils.result_cache import (
+    get_cached_result,
+    get_result_cache_key,
+    get_result_cache_version,
+    invalidate_cached_results,
+    is_result_cache_enabled,
+    store_cached_result,
+)
+from square_database.utils.serialization import (
+    ClosingStreamingResponse,
+    ORJSONResponse,
+    encode_ndjson_chunk,
+    encode_rows,
+)
+from square_database.utils.single_flight import run_single_flight
+from square_database.utils.statement_cache import get_cached_statements
+from square_database.utils.table_descriptors import get_table_descriptor
 
 
 @global_object_square_logger.auto_logger()
-def util_insert_rows_v0(insert_rows_model):
+async def prepare_insert_rows(database_name, insert_rows_model):
     try:
-        local_str_database_url = (
-            f"postgresql://{config_str_db_username}:{config_str_db_password}@"
-            f"{config_str_db_ip}:{str(config_int_db_port)}/{insert_rows_model.database_name}"
+        await validate_database_and_schema_name(
+            database_name, insert_rows_model.schema_name
         )
-        database_engine = create_engine(local_str_database_url)
-
-        # Connect to database
-        with database_engine.connect() as database_connection:
-            # ===========================================
-            # check if schema exists
-            schema_result = database_connection.execute(
-                text(
-                    "SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema"
-                ),
-                {"schema": insert_rows_model.schema_name},
-            ).scalar()
-
-            if not schema_result:
+        try:
+            table_descriptor = get_table_descriptor(
+                database_name,
+                insert_rows_model.schema_name,
+                insert_rows_model.table_name,
+            )
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+
+        # validate the column names in the insert_rows_model.data
+        valid_column_names = table_descriptor.column_names
+        for key in {key for row in insert_rows_model.data for key in row}:
+            if key not in valid_column_names:
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_SCHEMA_NAME"]
+                    message=messages["GENERIC_400"],
+                    log=f"Invalid column '{key}' for table '{table_descriptor.table.name}'. Valid columns are: {', '.join(sorted(valid_column_names))}",
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
-            # connect to schema
-            database_connection.execute(
-                text(f"SET search_path TO {insert_rows_model.schema_name}")
-            )
-            try:
-                table_class_name = snake_to_capital_camel(insert_rows_model.table_name)
-                table_module_path = (
-                    f"{config_str_database_module_name}.{insert_rows_model.database_name}"
-                    f".{insert_rows_model.schema_name}.tables"
+
+        conflict_column_names = None
+        update_column_names = None
+        if insert_rows_model.upsert is not None:
+            conflict_column_names = insert_rows_model.upsert.conflict_columns
+            update_column_names = insert_rows_model.upsert.update_columns
+            if update_column_names is None:
+                update_column_names = [
+                    key
+                    for key in insert_rows_model.data[0]
+                    if key not in conflict_column_names
+                ]
+            local_str_error = None
+            if insert_rows_model.skip_conflicts:
+                local_str_error = "skip_conflicts cannot be combined with upsert."
+            elif not update_column_names:
+                local_str_error = "upsert needs at least one column to update."
+            else:
+                # a column left out of a row would be overwritten with null or its
+                # default on conflict.
+                local_set_row_keys = set(insert_rows_model.data[0]).intersection(
+                    *insert_rows_model.data[1:]
                 )
-                table_module = importlib.import_module(table_module_path)
-                table_class = getattr(table_module, table_class_name)
-            except Exception as e:
+                for key in [*conflict_column_names, *update_column_names]:
+                    if key not in valid_column_names:
+                        local_str_error = f"Invalid column '{key}' for table '{table_descriptor.table.name}'. Valid columns are: {', '.join(sorted(valid_column_names))}"
+                        break
+                    if key in update_column_names and key not in local_set_row_keys:
+                        local_str_error = (
+                            f"update column '{key}' is missing from the inserted rows."
+                        )
+                        break
+            if local_str_error is not None:
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+                    message=messages["GENERIC_400"], log=local_str_error
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
-            local_object_session = sessionmaker(bind=database_engine)
-            session = local_object_session()
-            try:
-                if insert_rows_model.skip_conflicts:
-                    stmt = (
-                        insert(table_class)
-                        .values(insert_rows_model.data)
-                        .on_conflict_do_nothing()
-                        .returning(*table_class.__table__.columns)
-                    )
-                else:
-                    stmt = (
-                        insert(table_class)
-                        .values(insert_rows_model.data)
-                        .returning(*table_class.__table__.columns)
-                    )
 
-                result = session.execute(stmt)
-                inserted_rows = result.fetchall()
+        def insert_rows(session):
+            # paged multi row inserts, or COPY through a staging table for big batches.
+            inserted_rows = insert_rows_in_bulk(
+                session,
+                table_descriptor,
+                insert_rows_model.schema_name,
+                insert_rows_model.data,
+                insert_rows_model.skip_conflicts,
+                conflict_column_names,
+                update_column_names,
+            )
+            return encode_rows(
+                (row._mapping for row in inserted_rows),
+                table_descriptor,
+                table_descriptor.columns,
+            )
+
+        return table_descriptor, insert_rows
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_insert_rows_v0(insert_rows_model):
+    try:
+        table_descriptor, insert_rows = await prepare_insert_rows(
+            insert_rows_model.database_name, insert_rows_model
+        )
+
+        def run_insert_rows(session):
+            try:
+                return_this = insert_rows(session)
                 session.commit()
-                return_this = json.loads(
-                    json.dumps(
-                        [
-                            {
-                                key: value
-                                for key, value in row._asdict().items()
-                                if not key.startswith("_sa_")
-                            }
-                            for row in inserted_rows
-                        ],
-                        default=enum_fallback_serializer,
-                    )
-                )
-                session.close()
                 output_content = get_api_output_in_standard_format(
                     message=messages["CREATE_SUCCESSFUL"],
                     data={"main": return_this, "affected_count": len(return_this)},
                 )
-                return JSONResponse(
-                    status_code=status.HTTP_201_CREATED,
-                    content=output_content,
+                return ORJSONResponse(
+                    status_code=status.HTTP_201_CREATED, content=output_content
                 )
             except Exception as e:
                 session.rollback()
-                session.close()
                 output_content = get_api_output_in_standard_format(
                     message=messages["GENERIC_400"], log=str(e)
                 )
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
-    except OperationalError as oe:
-        global_object_square_logger.logger.error(oe, exc_info=True)
-        output_content = get_api_output_in_standard_format(
-            message=messages["INCORRECT_DATABASE_NAME"], log=str(oe)
+
+        response = await run_database_operation(
+            insert_rows_model.database_name,
+            table_descriptor.schema_translate_map,
+            run_insert_rows,
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content=output_content
+        invalidate_cached_results(
+            insert_rows_model.database_name,
+            insert_rows_model.schema_name,
+            insert_rows_model.table_name,
         )
+        return response
+    except OperationalError as oe:
+        raise await get_operational_error(insert_rows_model.database_name, oe)
     except Exception:
         raise
 
 
 @global_object_square_logger.auto_logger()
-def util_get_rows_v0(get_rows_model):
+async def prepare_get_rows(get_rows_model):
     try:
-        # Create the database URL
-        local_str_database_url = (
-            f"postgresql://{config_str_db_username}:{config_str_db_password}@"
-            f"{config_str_db_ip}:{str(config_int_db_port)}/{get_rows_model.database_name}"
+        await validate_database_and_schema_name(
+            get_rows_model.database_name, get_rows_model.schema_name
         )
-        database_engine = create_engine(local_str_database_url)
-
-        # Connect to the database
-        with database_engine.connect() as database_connection:
-            # ===========================================
-
-            # check if schema exists
-            schema_result = database_connection.execute(
-                text(
-                    "SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema"
-                ),
-                {"schema": get_rows_model.schema_name},
-            ).scalar()
-
-            if not schema_result:
-                output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_SCHEMA_NAME"]
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
-                )
-
-            # connect to schema
-            database_connection.execute(
-                text(f"SET search_path TO {get_rows_model.schema_name}")
+        try:
+            table_descriptor = get_table_descriptor(
+                get_rows_model.database_name,
+                get_rows_model.schema_name,
+                get_rows_model.table_name,
             )
-            # ===========================================
-
-            # Dynamically import table module and class
-            try:
-                table_class_name = snake_to_capital_camel(get_rows_model.table_name)
-                table_module_path = (
-                    f"{config_str_database_module_name}.{get_rows_model.database_name}"
-                    f".{get_rows_model.schema_name}.tables"
-                )
-                table_module = importlib.import_module(table_module_path)
-                table_class = getattr(table_module, table_class_name)
-            except Exception as e:
+            table_class = table_descriptor.table_class
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+        local_bool_use_cursor = (
+            get_rows_model.use_cursor or get_rows_model.cursor is not None
+        )
+        if local_bool_use_cursor and get_rows_model.offset:
+            output_content = get_api_output_in_standard_format(
+                message=messages["GENERIC_400"],
+                log="offset cannot be combined with cursor pagination.",
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+            )
+        # validate the requested columns, only these are selected from the table.
+        valid_column_names = table_descriptor.column_names
+        for column_name in get_rows_model.columns or []:
+            if column_name not in valid_column_names:
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+                    message=messages["GENERIC_400"],
+                    log=f"Invalid column '{column_name}' for table '{table_class.__tablename__}'. Valid columns are: {', '.join(sorted(valid_column_names))}",
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
+        local_list_column_names = list(
+            dict.fromkeys(get_rows_model.columns or table_descriptor.columns)
+        )
 
-            # Session management
-            local_object_session = sessionmaker(bind=database_engine)
-            session = local_object_session()
-
+        def get_rows(session):
             try:
+                if local_bool_use_cursor:
+                    order_by = get_cursor_order_by(
+                        get_rows_model.order_by, table_descriptor
+                    )
+                    # cursor keys are selected even when not requested, dropped below.
+                    local_list_query_column_names = local_list_column_names + [
+                        col.lstrip("-")
+                        for col in order_by
+                        if col.lstrip("-") in valid_column_names
+                        and col.lstrip("-") not in local_list_column_names
+                    ]
+                else:
+                    order_by = get_rows_model.order_by
+                    local_list_query_column_names = local_list_column_names
+                if get_rows_model.apply_filters and not has_filter_conditions(
+                    get_rows_model.filters.root, get_rows_model.filter_tree
+                ):
+                    return get_api_output_in_standard_format(
+                        data={
+                            "main": [],
+                            "total_count": 0,
+                            **({"next_cursor": None} if local_bool_use_cursor else {}),
+                        },
+                        message=messages["GENERIC_204"],
+                    )
+                # exact counts ride along as a window, except after a cursor which
+                # would narrow it.
+                local_bool_window_count = (
+                    get_rows_model.count_mode == "exact"
+                    and get_rows_model.cursor is None
+                )
 
-                query = session.query(table_class)
-
-                if get_rows_model.apply_filters:
-                    if not get_rows_model.filters.root:
-                        output_content = get_api_output_in_standard_format(
-                            data={"main": [], "total_count": 0},
-                            message=messages["GENERIC_204"],
+                def build_statements():
+                    # plain core select, rows come back as tuples without orm hydration.
+                    query = select(
+                        *get_labeled_columns(
+                            table_descriptor, local_list_query_column_names
+                        )
+                    )
+                    if get_rows_model.apply_filters:
+                        query = apply_filters(
+                            query,
+                            get_rows_model.filters.root,
+                            table_descriptor,
+                            get_rows_model.filter_tree,
                         )
-                        return JSONResponse(
-                            status_code=status.HTTP_200_OK,
-                            content=output_content,
+                    count_query = query
+                    if local_bool_window_count:
+                        # count(*) over () is evaluated before limit, same round trip.
+                        query = query.add_columns(
+                            func.count().over().label("_total_count")
                         )
+                    if local_bool_use_cursor:
+                        if get_rows_model.cursor is not None:
+                            query = apply_cursor(
+                                query,
+                                order_by,
+                                decode_cursor(
+                                    get_rows_model.cursor, order_by, table_descriptor
+                                ),
+                                table_descriptor,
+                            )
+                        query = apply_order_by(query, order_by, table_descriptor)
+                    else:
+                        query = apply_order_by(
+                            query, get_rows_model.order_by, table_descriptor
+                        )
+                    if get_rows_model.limit is not None:
+                        query = query.limit(bindparam("page_limit", type_=Integer))
+                    if get_rows_model.offset:
+                        query = query.offset(bindparam("page_offset", type_=Integer))
+                    return count_query, query
 
-                    query = apply_filters(
-                        query, get_rows_model.filters.root, table_class
+                # same shape, same statements, only the bound values change.
+                # cursor values are inlined by apply_cursor, those are built per request.
+                statement_key = (
+                    (
+                        get_rows_model.database_name,
+                        get_rows_model.schema_name,
+                        get_rows_model.table_name,
+                        tuple(local_list_query_column_names),
+                        (
+                            get_filter_shape(
+                                get_rows_model.filters.root, get_rows_model.filter_tree
+                            )
+                            if get_rows_model.apply_filters
+                            else None
+                        ),
+                        local_bool_window_count,
+                        local_bool_use_cursor,
+                        tuple(order_by),
+                        get_rows_model.limit is not None,
+                        bool(get_rows_model.offset),
+                    )
+                    if get_rows_model.cursor is None
+                    else None
+                )
+                count_query, query = get_cached_statements(
+                    statement_key, build_statements
+                )
+                parameters = (
+                    get_filter_parameters(
+                        get_rows_model.filters.root,
+                        table_descriptor,
+                        get_rows_model.filter_tree,
+                    )
+                    if get_rows_model.apply_filters
+                    else {}
+                )
+                if get_rows_model.limit is not None:
+                    # one extra row tells whether there is a next page.
+                    parameters["page_limit"] = get_rows_model.limit + (
+                        1 if local_bool_use_cursor else 0
                     )
+                if get_rows_model.offset:
+                    parameters["page_offset"] = get_rows_model.offset
                 # Count
-                total_count = query.count()
-                query = apply_order_by(query, get_rows_model.order_by, table_class)
-                query = query.limit(get_rows_model.limit).offset(get_rows_model.offset)
+                total_count = None
+                if get_rows_model.count_mode == "estimated":
+                    total_count = get_estimated_count(
+                        session,
+                        count_query,
+                        get_rows_model.schema_name,
+                        table_descriptor,
+                        get_rows_model.apply_filters,
+                        parameters,
+                    )
+                elif get_rows_model.count_mode == "exact" and (
+                    get_rows_model.cursor is not None
+                ):
+                    total_count = get_exact_count(session, count_query, parameters)
 
                 # Fetch results
-                filtered_rows = query.all()
+                filtered_rows = session.execute(query, parameters).all()
+                if local_bool_window_count:
+                    if filtered_rows:
+                        total_count = filtered_rows[0]._total_count
+                    elif get_rows_model.offset or get_rows_model.limit == 0:
+                        # offset past the end or limit 0, the window saw no rows.
+                        total_count = get_exact_count(session, count_query, parameters)
+                    else:
+                        total_count = 0
+                next_cursor = None
+                if (
+                    local_bool_use_cursor
+                    and get_rows_model.limit is not None
+                    and len(filtered_rows) > get_rows_model.limit
+                ):
+                    filtered_rows = filtered_rows[: get_rows_model.limit]
+                    next_cursor = encode_cursor(
+                        order_by,
+                        [
+                            getattr(filtered_rows[-1], col.lstrip("-"))
+                            for col in order_by
+                        ],
+                    )
 
                 # Format results to JSON-serializable format
-                # column filtering logic added manually
-                local_list_filtered_rows = [
-                    {
-                        key: value
-                        for key, value in x.__dict__.items()
-                        if not key.startswith("_")
-                        and (
-                            not get_rows_model.columns or key in get_rows_model.columns
-                        )
-                    }
-                    for x in filtered_rows
-                ]
-                output_content = get_api_output_in_standard_format(
+                return get_api_output_in_standard_format(
                     message=messages["READ_SUCCESSFUL"],
                     data={
-                        "main": json.loads(
-                            json.dumps(
-                                local_list_filtered_rows,
-                                default=enum_fallback_serializer,
-                            )
+                        "main": encode_rows(
+                            (x._mapping for x in filtered_rows),
+                            table_descriptor,
+                            local_list_column_names,
                         ),
                         "total_count": total_count,
+                        **(
+                            {"next_cursor": next_cursor}
+                            if local_bool_use_cursor
+                            else {}
+                        ),
                     },
                 )
-                return JSONResponse(
-                    status_code=status.HTTP_200_OK,
-                    content=output_content,
-                )
 
             except Exception as e:
                 output_content = get_api_output_in_standard_format(
@@ -260,245 +450,831 @@ def util_get_rows_v0(get_rows_model):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
-            finally:
-                # Ensure session is closed
-                session.close()
+
+        return table_descriptor, get_rows
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_get_rows_v0(get_rows_model):
+    try:
+        table_descriptor, get_rows = await prepare_get_rows(get_rows_model)
+        # primary reads ask for the latest data, they neither read nor fill the cache.
+        local_bool_use_result_cache = (
+            get_rows_model.consistency != "primary"
+            and is_result_cache_enabled(
+                get_rows_model.database_name,
+                get_rows_model.schema_name,
+                get_rows_model.table_name,
+            )
+        )
+        if local_bool_use_result_cache or config_bool_enable_single_flight:
+            result_key = get_result_cache_key(get_rows_model)
+            table_key = (
+                get_rows_model.database_name,
+                get_rows_model.schema_name,
+                get_rows_model.table_name,
+            )
+            # taken before the query, a write bumps it while the query runs.
+            result_cache_version = get_result_cache_version(table_key)
+        if local_bool_use_result_cache:
+            cached_body = get_cached_result(result_key)
+            if cached_body is not None:
+                return Response(
+                    content=cached_body,
+                    status_code=status.HTTP_200_OK,
+                    media_type="application/json",
+                )
+
+        def run_get_rows(session):
+            return ORJSONResponse(
+                status_code=status.HTTP_200_OK, content=get_rows(session)
+            )
+
+        async def read_rows():
+            response = await run_read_operation(
+                get_rows_model.database_name,
+                table_descriptor.schema_translate_map,
+                run_get_rows,
+                get_rows_model.consistency,
+            )
+            if local_bool_use_result_cache:
+                store_cached_result(
+                    result_key, table_key, result_cache_version, response.body
+                )
+            return response
+
+        if config_bool_enable_single_flight:
+            # identical reads share one query, a write in between starts a new one.
+            return await run_single_flight(
+                (result_key, get_rows_model.consistency, result_cache_version),
+                read_rows,
+            )
+        return await read_rows()
     except OperationalError as oe:
-        global_object_square_logger.logger.error(oe, exc_info=True)
-        output_content = get_api_output_in_standard_format(
-            message=messages["INCORRECT_DATABASE_NAME"], log=str(oe)
+        raise await get_operational_error(get_rows_model.database_name, oe)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_get_rows_many_v0(get_rows_many_model):
+    try:
+        local_object_semaphore = asyncio.Semaphore(
+            config_int_get_rows_many_max_concurrency
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content=output_content
+
+        # failures are reported in the entry of the query, the others still run.
+        async def get_rows_entry(get_rows_model):
+            async with local_object_semaphore:
+                try:
+                    table_descriptor, get_rows = await prepare_get_rows(get_rows_model)
+
+                    def run_get_rows(session):
+                        if config_int_get_rows_many_statement_timeout_milliseconds > 0:
+                            # local to the transaction, postgres cancels a slow query.
+                            session.execute(
+                                select(
+                                    func.set_config(
+                                        "statement_timeout",
+                                        str(
+                                            config_int_get_rows_many_statement_timeout_milliseconds
+                                        ),
+                                        True,
+                                    )
+                                )
+                            )
+                        return get_rows(session)
+
+                    output_content = await run_read_operation(
+                        get_rows_model.database_name,
+                        table_descriptor.schema_translate_map,
+                        run_get_rows,
+                        get_rows_model.consistency,
+                    )
+                    return {"status_code": status.HTTP_200_OK, **output_content}
+                except HTTPException as he:
+                    return {"status_code": he.status_code, **he.detail}
+                except OperationalError as oe:
+                    he = await get_operational_error(get_rows_model.database_name, oe)
+                    return {"status_code": he.status_code, **he.detail}
+                except Exception as e:
+                    global_object_square_logger.logger.error(e, exc_info=True)
+                    return {
+                        "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        **get_api_output_in_standard_format(
+                            message=messages["GENERIC_500"], log=str(e)
+                        ),
+                    }
+
+        local_list_results = await asyncio.gather(
+            *[
+                get_rows_entry(get_rows_model)
+                for get_rows_model in get_rows_many_model.queries.values()
+            ]
         )
+        output_content = get_api_output_in_standard_format(
+            message=messages["READ_SUCCESSFUL"],
+            data={"main": dict(zip(get_rows_many_model.queries, local_list_results))},
+        )
+        return ORJSONResponse(status_code=status.HTTP_200_OK, content=output_content)
     except Exception:
         raise
 
 
 @global_object_square_logger.auto_logger()
-def util_edit_rows_v0(edit_rows_model):
+async def util_get_rows_stream_v0(get_rows_model):
     try:
-        local_str_database_url = (
-            f"postgresql://{config_str_db_username}:{config_str_db_password}@"
-            f"{config_str_db_ip}:{str(config_int_db_port)}/{edit_rows_model.database_name}"
+        await validate_database_and_schema_name(
+            get_rows_model.database_name, get_rows_model.schema_name
         )
-        database_engine = create_engine(local_str_database_url)
-        # Connect to database
-        with database_engine.connect() as database_connection:
-            # ===========================================
-            # check if schema exists
-            schema_result = database_connection.execute(
-                text(
-                    "SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema"
-                ),
-                {"schema": edit_rows_model.schema_name},
-            ).scalar()
-
-            if not schema_result:
+        try:
+            table_descriptor = get_table_descriptor(
+                get_rows_model.database_name,
+                get_rows_model.schema_name,
+                get_rows_model.table_name,
+            )
+            table_class = table_descriptor.table_class
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+        if get_rows_model.use_cursor or get_rows_model.cursor is not None:
+            output_content = get_api_output_in_standard_format(
+                message=messages["GENERIC_400"],
+                log="cursor pagination is not supported when streaming, use limit and offset.",
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+            )
+        valid_column_names = table_descriptor.column_names
+        for column_name in get_rows_model.columns or []:
+            if column_name not in valid_column_names:
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_SCHEMA_NAME"]
+                    message=messages["GENERIC_400"],
+                    log=f"Invalid column '{column_name}' for table '{table_class.__tablename__}'. Valid columns are: {', '.join(sorted(valid_column_names))}",
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+                )
+        local_list_column_names = list(
+            dict.fromkeys(get_rows_model.columns or table_descriptor.columns)
+        )
+        if get_rows_model.apply_filters and not has_filter_conditions(
+            get_rows_model.filters.root, get_rows_model.filter_tree
+        ):
+            return StreamingResponse(iter(()), media_type="application/x-ndjson")
+        try:
+            query = select(
+                *get_labeled_columns(table_descriptor, local_list_column_names)
+            )
+            if get_rows_model.apply_filters:
+                query = apply_filters(
+                    query,
+                    get_rows_model.filters.root,
+                    table_descriptor,
+                    get_rows_model.filter_tree,
+                )
+            query = apply_order_by(query, get_rows_model.order_by, table_descriptor)
+            query = query.limit(get_rows_model.limit).offset(get_rows_model.offset)
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["GENERIC_400"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+            )
+
+        async def open_row_stream(replica):
+            row_stream = stream_database_rows(
+                get_rows_model.database_name,
+                table_descriptor.schema_translate_map,
+                query,
+                replica,
+            )
+            # fetch the first chunk here, so errors still get a regular json response.
+            try:
+                return row_stream, await anext(row_stream)
+            except StopAsyncIteration:
+                return row_stream, None
+
+        replica = await choose_read_replica(
+            get_rows_model.database_name, get_rows_model.consistency
+        )
+        try:
+            try:
+                local_object_row_stream, first_partition = await open_row_stream(
+                    replica
+                )
+            except OperationalError as oe:
+                if replica is None:
+                    raise
+                # the replica went away since its last check, read from the primary.
+                await eject_read_replica(get_rows_model.database_name, replica, oe)
+                local_object_row_stream, first_partition = await open_row_stream(None)
+        except (HTTPException, OperationalError):
+            raise
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["GENERIC_400"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+            )
+
+        async def generate_ndjson_chunks():
+            try:
+                if first_partition is None:
+                    return
+                yield encode_ndjson_chunk(
+                    (x._mapping for x in first_partition),
+                    table_descriptor,
+                    local_list_column_names,
                 )
+                async for partition in local_object_row_stream:
+                    yield encode_ndjson_chunk(
+                        (x._mapping for x in partition),
+                        table_descriptor,
+                        local_list_column_names,
+                    )
+            finally:
+                # gives back the connection and the admission slot right away.
+                await local_object_row_stream.aclose()
 
-            # connect to schema
-            database_connection.execute(
-                text(f"SET search_path TO {edit_rows_model.schema_name}")
+        return ClosingStreamingResponse(
+            generate_ndjson_chunks(),
+            local_object_row_stream.aclose,
+            media_type="application/x-ndjson",
+        )
+    except OperationalError as oe:
+        raise await get_operational_error(get_rows_model.database_name, oe)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def prepare_count_rows(count_rows_model, exists_only, cap=None):
+    try:
+        await validate_database_and_schema_name(
+            count_rows_model.database_name, count_rows_model.schema_name
+        )
+        try:
+            table_descriptor = get_table_descriptor(
+                count_rows_model.database_name,
+                count_rows_model.schema_name,
+                count_rows_model.table_name,
             )
-            # ===========================================
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+
+        def build_statement():
+            if exists_only or cap is not None:
+                matching_rows = select(literal_column("1")).select_from(
+                    table_descriptor.table
+                )
+            else:
+                matching_rows = select(func.count()).select_from(table_descriptor.table)
+            if count_rows_model.apply_filters:
+                matching_rows = apply_filters(
+                    matching_rows,
+                    count_rows_model.filters.root,
+                    table_descriptor,
+                    count_rows_model.filter_tree,
+                )
+            if exists_only:
+                # postgres stops at the first matching row.
+                return select(matching_rows.exists())
+            if cap is not None:
+                # the limit inside the subquery stops the scan after cap rows.
+                return select(func.count()).select_from(
+                    matching_rows.limit(
+                        bindparam("count_cap", type_=Integer)
+                    ).subquery()
+                )
+            return matching_rows
+
+        def count_rows(session):
             try:
-                table_class_name = snake_to_capital_camel(edit_rows_model.table_name)
-                table_module_path = (
-                    f"{config_str_database_module_name}.{edit_rows_model.database_name}"
-                    f".{edit_rows_model.schema_name}.tables"
+                if count_rows_model.apply_filters and not has_filter_conditions(
+                    count_rows_model.filters.root, count_rows_model.filter_tree
+                ):
+                    # empty filters match nothing.
+                    return 0
+                statement = get_cached_statements(
+                    (
+                        "exists_rows" if exists_only else "count_rows",
+                        count_rows_model.database_name,
+                        count_rows_model.schema_name,
+                        count_rows_model.table_name,
+                        (
+                            get_filter_shape(
+                                count_rows_model.filters.root,
+                                count_rows_model.filter_tree,
+                            )
+                            if count_rows_model.apply_filters
+                            else None
+                        ),
+                        cap is not None,
+                    ),
+                    build_statement,
+                )
+                parameters = (
+                    get_filter_parameters(
+                        count_rows_model.filters.root,
+                        table_descriptor,
+                        count_rows_model.filter_tree,
+                    )
+                    if count_rows_model.apply_filters
+                    else {}
                 )
-                table_module = importlib.import_module(table_module_path)
-                table_class = getattr(table_module, table_class_name)
+                if cap is not None:
+                    parameters["count_cap"] = cap
+                return session.execute(statement, parameters).scalar_one()
             except Exception as e:
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+                    message=messages["GENERIC_400"], log=str(e)
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
-                )
-            # validate the column names in the edit_rows_model.data
-            mapper = inspect(table_class)
-            valid_column_names = {col.key for col in mapper.columns}
-            for key in edit_rows_model.data.keys():
-                if key not in valid_column_names:
-                    output_content = get_api_output_in_standard_format(
-                        message=messages["GENERIC_400"],
-                        log=f"Invalid column '{key}' for table '{table_class.__tablename__}'. Valid columns are: {', '.join(valid_column_names)}",
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
-                    )
-            local_object_session = sessionmaker(bind=database_engine)
-            session = local_object_session()
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+                )
+
+        return table_descriptor, count_rows
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_exists_rows_v0(exists_rows_model):
+    try:
+        table_descriptor, exists_rows = await prepare_count_rows(
+            exists_rows_model, True
+        )
+
+        def run_exists_rows(session):
+            output_content = get_api_output_in_standard_format(
+                message=messages["READ_SUCCESSFUL"],
+                data={"exists": bool(exists_rows(session))},
+            )
+            return ORJSONResponse(
+                status_code=status.HTTP_200_OK, content=output_content
+            )
+
+        return await run_read_operation(
+            exists_rows_model.database_name,
+            table_descriptor.schema_translate_map,
+            run_exists_rows,
+            exists_rows_model.consistency,
+        )
+    except OperationalError as oe:
+        raise await get_operational_error(exists_rows_model.database_name, oe)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_count_rows_v0(count_rows_model):
+    try:
+        table_descriptor, count_rows = await prepare_count_rows(
+            count_rows_model, False, count_rows_model.cap
+        )
+
+        def run_count_rows(session):
+            total_count = count_rows(session)
+            output_content = get_api_output_in_standard_format(
+                message=messages["READ_SUCCESSFUL"],
+                data={
+                    "total_count": total_count,
+                    # counting stopped at cap, there are at least total_count rows.
+                    "capped": count_rows_model.cap is not None
+                    and total_count >= count_rows_model.cap,
+                },
+            )
+            return ORJSONResponse(
+                status_code=status.HTTP_200_OK, content=output_content
+            )
+
+        return await run_read_operation(
+            count_rows_model.database_name,
+            table_descriptor.schema_translate_map,
+            run_count_rows,
+            count_rows_model.consistency,
+        )
+    except OperationalError as oe:
+        raise await get_operational_error(count_rows_model.database_name, oe)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_aggregate_rows_v0(aggregate_rows_model):
+    try:
+        await validate_database_and_schema_name(
+            aggregate_rows_model.database_name, aggregate_rows_model.schema_name
+        )
+        try:
+            table_descriptor = get_table_descriptor(
+                aggregate_rows_model.database_name,
+                aggregate_rows_model.schema_name,
+                aggregate_rows_model.table_name,
+            )
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+
+        def raise_invalid_request(log):
+            output_content = get_api_output_in_standard_format(
+                message=messages["GENERIC_400"], log=log
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+            )
+
+        valid_column_names = table_descriptor.column_names
+        local_list_referenced_column_names = [
+            group_by.column for group_by in aggregate_rows_model.group_by
+        ] + [
+            aggregate.column
+            for aggregate in aggregate_rows_model.aggregates
+            if aggregate.column is not None
+        ]
+        for column_name in local_list_referenced_column_names:
+            if column_name not in valid_column_names:
+                raise_invalid_request(
+                    f"Invalid column '{column_name}' for table '{table_descriptor.table.name}'. Valid columns are: {', '.join(sorted(valid_column_names))}"
+                )
+        # output name -> (kind, group_by or aggregate model), in select order.
+        local_dict_outputs = {}
+        for group_by in aggregate_rows_model.group_by:
+            if group_by.date_trunc is not None and not isinstance(
+                table_descriptor.column_types[group_by.column], (Date, DateTime)
+            ):
+                raise_invalid_request(
+                    f"date_trunc needs a date or timestamp column, '{group_by.column}' is neither."
+                )
+            output_name = group_by.alias or group_by.column
+            if output_name in local_dict_outputs:
+                raise_invalid_request(f"Duplicate output name '{output_name}'.")
+            local_dict_outputs[output_name] = ("group_by", group_by)
+        for aggregate in aggregate_rows_model.aggregates:
+            if aggregate.column is None and aggregate.function != "count":
+                raise_invalid_request(f"{aggregate.function} needs a column.")
+            output_name = (
+                aggregate.alias or f"{aggregate.function}_{aggregate.column or 'all'}"
+            )
+            if output_name in local_dict_outputs:
+                raise_invalid_request(f"Duplicate output name '{output_name}'.")
+            local_dict_outputs[output_name] = ("aggregate", aggregate)
+        for output_name in aggregate_rows_model.having:
+            if (
+                output_name not in local_dict_outputs
+                or local_dict_outputs[output_name][0] != "aggregate"
+            ):
+                raise_invalid_request(
+                    f"having must reference an aggregate, '{output_name}' is not one."
+                )
+        for output_name in aggregate_rows_model.order_by:
+            if output_name.lstrip("-") not in local_dict_outputs:
+                raise_invalid_request(
+                    f"order_by must reference a group_by or aggregate output, '{output_name.lstrip('-')}' is not one."
+                )
+
+        def aggregate_rows(session):
             try:
-                # Get rows from filters
-                query = session.query(table_class)
-                if edit_rows_model.apply_filters:
-                    if not edit_rows_model.filters.root:
-                        filtered_rows = []
+                local_dict_expressions = {}
+                local_dict_column_encoders = {}
+                local_list_group_by_expressions = []
+                for output_name, (kind, output) in local_dict_outputs.items():
+                    column = table_descriptor.columns.get(output.column)
+                    if kind == "group_by":
+                        if output.date_trunc is not None:
+                            # inlined unit, select and group by must render the same sql.
+                            expression = func.date_trunc(
+                                literal_column(f"'{output.date_trunc}'"), column
+                            )
+                            local_dict_column_encoders[output_name] = str
+                        else:
+                            expression = column
+                        local_list_group_by_expressions.append(expression)
+                    elif column is None:
+                        expression = func.count()
+                    else:
+                        expression = getattr(func, output.function)(
+                            distinct(column) if output.distinct else column
+                        )
+                        # postgres answers avg (and sum of bigint) with numeric, which
+                        # would come back as a string, only decimal columns keep it.
+                        if output.function in ("avg", "sum") and not (
+                            isinstance(column.type, Numeric) and column.type.asdecimal
+                        ):
+                            expression = cast(
+                                expression,
+                                (
+                                    BigInteger
+                                    if output.function == "sum"
+                                    and isinstance(column.type, Integer)
+                                    else Float
+                                ),
+                            )
+                    if (
+                        output_name not in local_dict_column_encoders
+                        and column is not None
+                        and (
+                            kind == "group_by"
+                            or output.function in ("min", "max", "avg", "sum")
+                        )
+                    ):
+                        column_encoder = table_descriptor.column_encoders.get(
+                            output.column
+                        )
+                        if column_encoder is not None:
+                            local_dict_column_encoders[output_name] = column_encoder
+                    local_dict_expressions[output_name] = expression
+                query = select(
+                    *[
+                        expression.label(output_name)
+                        for output_name, expression in local_dict_expressions.items()
+                    ]
+                )
+                if aggregate_rows_model.apply_filters:
+                    if not has_filter_conditions(
+                        aggregate_rows_model.filters.root,
+                        aggregate_rows_model.filter_tree,
+                    ):
+                        # empty filters match nothing, aggregates over no rows.
+                        query = query.where(false())
                     else:
                         query = apply_filters(
-                            query, edit_rows_model.filters.root, table_class
+                            query,
+                            aggregate_rows_model.filters.root,
+                            table_descriptor,
+                            aggregate_rows_model.filter_tree,
                         )
-                        filtered_rows = query.all()
-                else:
-                    filtered_rows = query.all()
-                # ===========================================
-                for row in filtered_rows:
-                    for key, value in edit_rows_model.data.items():
-                        # edit rows
-                        setattr(row, key, value)
-                        # ===========================================
-                session.commit()
-                for row in filtered_rows:
-                    session.refresh(row)
-                local_list_filtered_rows = [
-                    {
-                        key: value
-                        for key, value in x.__dict__.items()
-                        if not key.startswith("_")
-                    }
-                    for x in filtered_rows
-                ]
-                session.close()
-                return_this = json.loads(
-                    json.dumps(
-                        local_list_filtered_rows, default=enum_fallback_serializer
-                    )
+                if local_list_group_by_expressions:
+                    query = query.group_by(*local_list_group_by_expressions)
+                for index, (output_name, condition) in enumerate(
+                    aggregate_rows_model.having.items()
+                ):
+                    for operator, value in get_filter_conditions(condition):
+                        query = query.having(
+                            get_filter_clause(
+                                local_dict_expressions[output_name],
+                                operator,
+                                get_filter_bind_name("having", index, operator),
+                                value,
+                            )
+                        )
+                query = query.order_by(
+                    *[
+                        (
+                            local_dict_expressions[output_name[1:]].desc()
+                            if output_name.startswith("-")
+                            else local_dict_expressions[output_name].asc()
+                        )
+                        for output_name in aggregate_rows_model.order_by
+                    ]
+                )
+                query = query.limit(aggregate_rows_model.limit).offset(
+                    aggregate_rows_model.offset
                 )
                 output_content = get_api_output_in_standard_format(
-                    message=messages["UPDATE_SUCCESSFUL"],
+                    message=messages["READ_SUCCESSFUL"],
                     data={
-                        "main": return_this,
-                        "affected_count": len(return_this),
+                        "main": encode_rows(
+                            (x._mapping for x in session.execute(query)),
+                            table_descriptor,
+                            local_dict_expressions,
+                            local_dict_column_encoders,
+                        )
                     },
                 )
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=status.HTTP_200_OK, content=output_content
                 )
             except Exception as e:
-                session.rollback()
-                session.close()
                 output_content = get_api_output_in_standard_format(
                     message=messages["GENERIC_400"], log=str(e)
                 )
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
-    except OperationalError as oe:
-        global_object_square_logger.logger.error(oe, exc_info=True)
-        output_content = get_api_output_in_standard_format(
-            message=messages["INCORRECT_DATABASE_NAME"], log=str(oe)
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content=output_content
+
+        return await run_read_operation(
+            aggregate_rows_model.database_name,
+            table_descriptor.schema_translate_map,
+            aggregate_rows,
+            aggregate_rows_model.consistency,
         )
+    except OperationalError as oe:
+        raise await get_operational_error(aggregate_rows_model.database_name, oe)
     except Exception:
         raise
 
 
 @global_object_square_logger.auto_logger()
-def util_delete_rows_v0(delete_rows_model):
+async def prepare_edit_rows(database_name, edit_rows_model):
     try:
-        local_str_database_url = (
-            f"postgresql://{config_str_db_username}:{config_str_db_password}@"
-            f"{config_str_db_ip}:{str(config_int_db_port)}/{delete_rows_model.database_name}"
+        await validate_database_and_schema_name(
+            database_name, edit_rows_model.schema_name
         )
-        database_engine = create_engine(local_str_database_url)
-        # Connect to database
-        with database_engine.connect() as database_connection:
-            # ===========================================
-            # check if schema exists
-            schema_result = database_connection.execute(
-                text(
-                    "SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema"
-                ),
-                {"schema": delete_rows_model.schema_name},
-            ).scalar()
-
-            if not schema_result:
+        try:
+            table_descriptor = get_table_descriptor(
+                database_name,
+                edit_rows_model.schema_name,
+                edit_rows_model.table_name,
+            )
+            table_class = table_descriptor.table_class
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+        # validate the column names in the edit_rows_model.data
+        valid_column_names = table_descriptor.column_names
+        for key in edit_rows_model.data.keys():
+            if key not in valid_column_names:
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_SCHEMA_NAME"]
+                    message=messages["GENERIC_400"],
+                    log=f"Invalid column '{key}' for table '{table_class.__tablename__}'. Valid columns are: {', '.join(sorted(valid_column_names))}",
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+                )
+
+        def edit_rows(session):
+            if edit_rows_model.apply_filters and not has_filter_conditions(
+                edit_rows_model.filters.root, edit_rows_model.filter_tree
+            ):
+                return []
+            local_list_returning_columns = get_labeled_columns(
+                table_descriptor, table_descriptor.columns
+            )
+            # one UPDATE ... RETURNING for all matching rows, nothing is loaded first.
+            if edit_rows_model.data:
+                stmt = (
+                    update(table_descriptor.table)
+                    .values(
+                        {
+                            table_descriptor.columns[key]: coerce_column_value(
+                                table_descriptor, key, value
+                            )
+                            for key, value in edit_rows_model.data.items()
+                        }
+                    )
+                    .returning(*local_list_returning_columns)
+                )
+            else:
+                # nothing to set, return the matching rows as they are.
+                stmt = select(*local_list_returning_columns)
+            if edit_rows_model.apply_filters:
+                stmt = apply_filters(
+                    stmt,
+                    edit_rows_model.filters.root,
+                    table_descriptor,
+                    edit_rows_model.filter_tree,
                 )
-            # connect to schema
-            database_connection.execute(
-                text(f"SET search_path TO {delete_rows_model.schema_name}")
+            return encode_rows(
+                (row._mapping for row in session.execute(stmt)),
+                table_descriptor,
+                table_descriptor.columns,
             )
+
+        return table_descriptor, edit_rows
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_edit_rows_v0(edit_rows_model):
+    try:
+        table_descriptor, edit_rows = await prepare_edit_rows(
+            edit_rows_model.database_name, edit_rows_model
+        )
+
+        def run_edit_rows(session):
             try:
-                table_class_name = snake_to_capital_camel(delete_rows_model.table_name)
-                table_module_path = (
-                    f"{config_str_database_module_name}.{delete_rows_model.database_name}"
-                    f".{delete_rows_model.schema_name}.tables"
+                return_this = edit_rows(session)
+                session.commit()
+                output_content = get_api_output_in_standard_format(
+                    message=messages["UPDATE_SUCCESSFUL"],
+                    data={"main": return_this, "affected_count": len(return_this)},
+                )
+                return ORJSONResponse(
+                    status_code=status.HTTP_200_OK, content=output_content
                 )
-                table_module = importlib.import_module(table_module_path)
-                table_class = getattr(table_module, table_class_name)
             except Exception as e:
+                session.rollback()
                 output_content = get_api_output_in_standard_format(
-                    message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+                    message=messages["GENERIC_400"], log=str(e)
                 )
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=output_content,
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+                )
+
+        response = await run_database_operation(
+            edit_rows_model.database_name,
+            table_descriptor.schema_translate_map,
+            run_edit_rows,
+        )
+        invalidate_cached_results(
+            edit_rows_model.database_name,
+            edit_rows_model.schema_name,
+            edit_rows_model.table_name,
+        )
+        return response
+    except OperationalError as oe:
+        raise await get_operational_error(edit_rows_model.database_name, oe)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def prepare_delete_rows(database_name, delete_rows_model):
+    try:
+        await validate_database_and_schema_name(
+            database_name, delete_rows_model.schema_name
+        )
+        try:
+            table_descriptor = get_table_descriptor(
+                database_name,
+                delete_rows_model.schema_name,
+                delete_rows_model.table_name,
+            )
+        except Exception as e:
+            output_content = get_api_output_in_standard_format(
+                message=messages["INCORRECT_TABLE_NAME"], log=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=output_content,
+            )
+
+        def delete_rows(session):
+            if delete_rows_model.apply_filters and not has_filter_conditions(
+                delete_rows_model.filters.root, delete_rows_model.filter_tree
+            ):
+                # empty filters match nothing, do not touch the table at all.
+                return []
+            # one DELETE ... RETURNING, deleted rows come back from the same statement.
+            stmt = delete(table_descriptor.table).returning(
+                *get_labeled_columns(table_descriptor, table_descriptor.columns)
+            )
+            if delete_rows_model.apply_filters:
+                stmt = apply_filters(
+                    stmt,
+                    delete_rows_model.filters.root,
+                    table_descriptor,
+                    delete_rows_model.filter_tree,
                 )
+            return encode_rows(
+                (row._mapping for row in session.execute(stmt)),
+                table_descriptor,
+                table_descriptor.columns,
+            )
+
+        return table_descriptor, delete_rows
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_delete_rows_v0(delete_rows_model):
+    try:
+        table_descriptor, delete_rows = await prepare_delete_rows(
+            delete_rows_model.database_name, delete_rows_model
+        )
 
-            local_object_session = sessionmaker(bind=database_engine)
-            session = local_object_session()
+        def run_delete_rows(session):
             try:
-                # Get rows from filters
-                query = session.query(table_class)
-                if delete_rows_model.apply_filters:
-                    if not delete_rows_model.filters.root:
-                        filtered_rows = []
-                    else:
-                        query = apply_filters(
-                            query, delete_rows_model.filters.root, table_class
-                        )
-                        filtered_rows = query.all()
-                else:
-                    filtered_rows = query.all()
-                # ===========================================
-                local_list_filtered_rows = [
-                    {
-                        key: value
-                        for key, value in x.__dict__.items()
-                        if not key.startswith("_")
-                    }
-                    for x in filtered_rows
-                ]
-                # delete all rows at once
-                if query:
-                    query.delete()
-                # ===========================================
+                return_this = delete_rows(session)
                 session.commit()
-                session.close()
-                return_this = json.loads(
-                    json.dumps(
-                        local_list_filtered_rows, default=enum_fallback_serializer
-                    )
-                )
                 output_content = get_api_output_in_standard_format(
                     message=messages["DELETE_SUCCESSFUL"],
                     data={"main": return_this, "affected_count": len(return_this)},
                 )
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=status.HTTP_200_OK, content=output_content
                 )
             except Exception as e:
-                # no need for this but kept it anyway :/
                 session.rollback()
-                session.close()
                 output_content = get_api_output_in_standard_format(
                     message=messages["GENERIC_400"], log=str(e)
                 )
@@ -506,13 +1282,101 @@ def util_delete_rows_v0(delete_rows_model):
                     status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
                 )
 
-    except OperationalError as oe:
-        global_object_square_logger.logger.error(oe, exc_info=True)
-        output_content = get_api_output_in_standard_format(
-            message=messages["INCORRECT_DATABASE_NAME"], log=str(oe)
+        response = await run_database_operation(
+            delete_rows_model.database_name,
+            table_descriptor.schema_translate_map,
+            run_delete_rows,
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content=output_content
+        invalidate_cached_results(
+            delete_rows_model.database_name,
+            delete_rows_model.schema_name,
+            delete_rows_model.table_name,
         )
+        return response
+    except OperationalError as oe:
+        raise await get_operational_error(delete_rows_model.database_name, oe)
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+async def util_batch_v0(batch_model):
+    try:
+        local_dict_prepare_functions = {
+            "insert_rows": prepare_insert_rows,
+            "edit_rows": prepare_edit_rows,
+            "delete_rows": prepare_delete_rows,
+        }
+        local_list_prepared_operations = []
+        # validate every operation before a connection is taken.
+        for index, operation_model in enumerate(batch_model.operations):
+            try:
+                local_list_prepared_operations.append(
+                    await local_dict_prepare_functions[operation_model.operation](
+                        batch_model.database_name, operation_model
+                    )
+                )
+            except HTTPException as he:
+                if isinstance(he.detail, dict):
+                    he.detail["log"] = f"operation {index}: {he.detail.get('log')}"
+                raise
+
+        def run_batch(session):
+            local_list_results = []
+            index = None
+            try:
+                for index, (table_descriptor, operation) in enumerate(
+                    local_list_prepared_operations
+                ):
+                    # operations may target different schemas of the same database.
+                    session.connection().execution_options(
+                        schema_translate_map=table_descriptor.schema_translate_map
+                    )
+                    return_this = operation(session)
+                    local_list_results.append(
+                        {
+                            "operation": batch_model.operations[index].operation,
+                            "main": return_this,
+                            "affected_count": len(return_this),
+                        }
+                    )
+                session.commit()
+                output_content = get_api_output_in_standard_format(
+                    message=messages["BATCH_SUCCESSFUL"],
+                    data={
+                        "main": local_list_results,
+                        "affected_count": sum(
+                            result["affected_count"] for result in local_list_results
+                        ),
+                    },
+                )
+                return ORJSONResponse(
+                    status_code=status.HTTP_200_OK, content=output_content
+                )
+            except Exception as e:
+                session.rollback()
+                output_content = get_api_output_in_standard_format(
+                    message=messages["GENERIC_400"],
+                    log=f"operation {index} failed: {e}",
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=output_content
+                )
+
+        # one session, one connection and one transaction for the whole batch.
+        response = await run_database_operation(
+            batch_model.database_name,
+            local_list_prepared_operations[0][0].schema_translate_map,
+            run_batch,
+        )
+        for operation_model in batch_model.operations:
+            invalidate_cached_results(
+                batch_model.database_name,
+                operation_model.schema_name,
+                operation_model.table_name,
+            )
+        return response
+    except OperationalError as oe:
+        raise await get_operational_error(batch_model.database_name, oe)
     except Exception:
         raise
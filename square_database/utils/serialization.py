@@ -0,0 +1,94 @@
+import json
+from enum import Enum
+
+import anyio
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import Date, DateTime, LargeBinary, Numeric, Time, Uuid
+from sqlalchemy import Enum as SqlalchemyEnum
+
+from square_database.utils.common_operations import enum_fallback_serializer
+
+
+def dump_json(content, sort_keys=False):
+    try:
+        return orjson.dumps(
+            content,
+            default=enum_fallback_serializer,
+            option=orjson.OPT_SORT_KEYS if sort_keys else None,
+        )
+    except TypeError:
+        # orjson rejects integers beyond 64 bits (json columns can hold them), the
+        # stdlib encoder does not.
+        return json.dumps(
+            content,
+            default=enum_fallback_serializer,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            sort_keys=sort_keys,
+        ).encode()
+
+
+class ORJSONResponse(JSONResponse):
+    # encodes the standard output envelope straight to bytes in one pass.
+    def render(self, content):
+        return dump_json(content)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    # starlette leaves an abandoned body iterator to garbage collection, close_stream
+    # releases what feeds it (pooled connection, admission slot) once the response ends,
+    # even when the client went away before the body was read.
+    def __init__(self, content, close_stream, **kwargs):
+        super().__init__(content, **kwargs)
+        self.close_stream = close_stream
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+                await self.close_stream()
+
+
+def encode_enum(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def get_column_encoder(column_type):
+    # same output as the old json.dumps(..., default=enum_fallback_serializer) round trip.
+    if isinstance(column_type, SqlalchemyEnum):
+        return encode_enum
+    if isinstance(column_type, (DateTime, Date, Time, Uuid, LargeBinary)):
+        return str
+    if isinstance(column_type, Numeric) and column_type.asdecimal:
+        return str
+    return None
+
+
+# not wrapped in auto_logger, its debug message would format every row of the result.
+def encode_rows(row_mappings, table_descriptor, column_names, column_encoders=None):
+    # column_encoders replaces the table encoders for computed result columns.
+    if column_encoders is None:
+        column_encoders = table_descriptor.column_encoders
+    local_list_column_encoders = [
+        (column_name, column_encoders.get(column_name)) for column_name in column_names
+    ]
+    local_list_rows = []
+    for row_mapping in row_mappings:
+        local_dict_row = {}
+        for column_name, column_encoder in local_list_column_encoders:
+            value = row_mapping[column_name]
+            if column_encoder is not None and value is not None:
+                value = column_encoder(value)
+            local_dict_row[column_name] = value
+        local_list_rows.append(local_dict_row)
+    return local_list_rows
+
+
+def encode_ndjson_chunk(row_mappings, table_descriptor, column_names):
+    return b"".join(
+        dump_json(row) + b"\n"
+        for row in encode_rows(row_mappings, table_descriptor, column_names)
+    )
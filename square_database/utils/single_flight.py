@@ -0,0 +1,54 @@
+import asyncio
+
+from square_database.configuration import global_object_square_logger
+
+# (event loop, flight key) -> task running the read, shared by every identical request
+# meanwhile. a task can only be awaited from its own loop.
+global_dict_in_flight_reads = {}
+global_dict_single_flight_counters = {
+    "leader_count": 0,
+    "follower_count": 0,
+}
+
+
+def finish_flight(flight_key, task):
+    if global_dict_in_flight_reads.get(flight_key) is task:
+        del global_dict_in_flight_reads[flight_key]
+    # followers may all have gone away, do not warn about an unretrieved exception.
+    if not task.cancelled():
+        task.exception()
+
+
+async def run_single_flight(flight_key, read):
+    flight_key = (asyncio.get_running_loop(), flight_key)
+    task = global_dict_in_flight_reads.get(flight_key)
+    if task is not None:
+        global_dict_single_flight_counters["follower_count"] += 1
+    else:
+        global_dict_single_flight_counters["leader_count"] += 1
+        task = asyncio.ensure_future(read())
+        global_dict_in_flight_reads[flight_key] = task
+        task.add_done_callback(lambda done_task: finish_flight(flight_key, done_task))
+    # a cancelled request leaves the read running for the others.
+    return await asyncio.shield(task)
+
+
+@global_object_square_logger.auto_logger()
+def get_single_flight_metrics():
+    try:
+        local_int_request_count = (
+            global_dict_single_flight_counters["leader_count"]
+            + global_dict_single_flight_counters["follower_count"]
+        )
+        return {
+            "in_flight": len(global_dict_in_flight_reads),
+            **global_dict_single_flight_counters,
+            "coalesced_rate": (
+                global_dict_single_flight_counters["follower_count"]
+                / local_int_request_count
+                if local_int_request_count
+                else None
+            ),
+        }
+    except Exception:
+        raise
@@ -0,0 +1,59 @@
+import collections
+import threading
+
+from square_database.configuration import (
+    config_int_statement_cache_size,
+    global_object_square_logger,
+)
+
+# statement key -> statements built for that query shape, least recently used first.
+global_dict_statement_cache = collections.OrderedDict()
+global_dict_statement_cache_counters = {
+    "hit_count": 0,
+    "miss_count": 0,
+    "eviction_count": 0,
+}
+# statements are looked up from the database threads.
+global_object_statement_cache_lock = threading.Lock()
+
+
+# not wrapped in auto_logger, formatting a statement for the debug message compiles it.
+def get_cached_statements(statement_key, build_statements):
+    if config_int_statement_cache_size <= 0 or statement_key is None:
+        return build_statements()
+    with global_object_statement_cache_lock:
+        statements = global_dict_statement_cache.get(statement_key)
+        if statements is not None:
+            global_dict_statement_cache.move_to_end(statement_key)
+            global_dict_statement_cache_counters["hit_count"] += 1
+            return statements
+    statements = build_statements()
+    with global_object_statement_cache_lock:
+        global_dict_statement_cache_counters["miss_count"] += 1
+        global_dict_statement_cache[statement_key] = statements
+        while len(global_dict_statement_cache) > config_int_statement_cache_size:
+            global_dict_statement_cache.popitem(last=False)
+            global_dict_statement_cache_counters["eviction_count"] += 1
+    return statements
+
+
+@global_object_square_logger.auto_logger()
+def get_statement_cache_metrics():
+    try:
+        local_int_lookup_count = (
+            global_dict_statement_cache_counters["hit_count"]
+            + global_dict_statement_cache_counters["miss_count"]
+        )
+        return {
+            "size": len(global_dict_statement_cache),
+            "max_size": config_int_statement_cache_size,
+            **global_dict_statement_cache_counters,
+            "hit_rate": (
+                global_dict_statement_cache_counters["hit_count"]
+                / local_int_lookup_count
+                if local_int_lookup_count
+                else None
+            ),
+        }
+    except Exception:
+        raise
@@ -0,0 +1,134 @@
+import datetime
+import importlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Tuple
+
+from sqlalchemy import Date, DateTime, Enum, Time, inspect
+
+from square_database.configuration import (
+    config_str_database_module_name,
+    global_object_square_logger,
+)
+from square_database.utils.common_operations import snake_to_capital_camel
+from square_database.utils.serialization import get_column_encoder
+
+# upper bound for remembered invalid names, they come straight from clients.
+global_int_max_invalid_table_names = 1024
+
+# (database_name, schema_name, table_name) -> TableDescriptor
+global_dict_table_descriptors = {}
+# (database_name, schema_name, table_name) -> error message
+global_dict_invalid_table_names = {}
+
+
+@dataclass(frozen=True)
+class TableDescriptor:
+    table_class: Any
+    table: Any
+    column_attributes: Dict[str, Any]
+    # attribute key -> core column, used by the orm-free statements.
+    columns: Dict[str, Any]
+    column_types: Dict[str, Any]
+    column_names: FrozenSet[str]
+    primary_key_column_names: Tuple[str, ...]
+    enum_column_names: FrozenSet[str] = field(default_factory=frozenset)
+    non_nullable_column_names: FrozenSet[str] = field(default_factory=frozenset)
+    # column name -> parser for iso strings sent by clients for temporal columns.
+    column_value_parsers: Dict[str, Callable] = field(default_factory=dict)
+    # column name -> encoder producing json friendly values, see get_column_encoder.
+    column_encoders: Dict[str, Callable] = field(default_factory=dict)
+    # maps the schema declared on the table to the requested schema.
+    schema_translate_map: Dict[Any, str] = field(default_factory=dict)
+
+
+@global_object_square_logger.auto_logger()
+def build_table_descriptor(table_class, schema_name):
+    try:
+        mapper = inspect(table_class)
+        column_attributes = {}
+        columns = {}
+        column_types = {}
+        for column_property in mapper.column_attrs:
+            column_attributes[column_property.key] = getattr(
+                table_class, column_property.key
+            )
+            columns[column_property.key] = column_property.columns[0]
+            column_types[column_property.key] = column_property.columns[0].type
+        primary_key_column_names = tuple(
+            mapper.get_property_by_column(column).key for column in mapper.primary_key
+        )
+        enum_column_names = frozenset(
+            key
+            for key, column_type in column_types.items()
+            if isinstance(column_type, Enum)
+        )
+        non_nullable_column_names = frozenset(
+            column_property.key
+            for column_property in mapper.column_attrs
+            if not column_property.columns[0].nullable
+        )
+        column_value_parsers = {}
+        for key, column_type in column_types.items():
+            if isinstance(column_type, DateTime):
+                column_value_parsers[key] = datetime.datetime.fromisoformat
+            elif isinstance(column_type, Date):
+                column_value_parsers[key] = datetime.date.fromisoformat
+            elif isinstance(column_type, Time):
+                column_value_parsers[key] = datetime.time.fromisoformat
+        column_encoders = {}
+        for key, column_type in column_types.items():
+            column_encoder = get_column_encoder(column_type)
+            if column_encoder is not None:
+                column_encoders[key] = column_encoder
+        return TableDescriptor(
+            table_class=table_class,
+            table=table_class.__table__,
+            column_attributes=column_attributes,
+            columns=columns,
+            column_types=column_types,
+            column_names=frozenset(column_attributes),
+            primary_key_column_names=primary_key_column_names,
+            enum_column_names=enum_column_names,
+            non_nullable_column_names=non_nullable_column_names,
+            column_value_parsers=column_value_parsers,
+            column_encoders=column_encoders,
+            schema_translate_map={table_class.__table__.schema: schema_name},
+        )
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def get_table_descriptor(database_name, schema_name, table_name):
+    try:
+        local_tuple_key = (database_name, schema_name, table_name)
+        table_descriptor = global_dict_table_descriptors.get(local_tuple_key)
+        if table_descriptor is not None:
+            return table_descriptor
+        local_str_error = global_dict_invalid_table_names.get(local_tuple_key)
+        if local_str_error is not None:
+            raise LookupError(local_str_error)
+        try:
+            table_class_name = snake_to_capital_camel(table_name)
+            table_module_path = (
+                f"{config_str_database_module_name}.{database_name}"
+                f".{schema_name}.tables"
+            )
+            table_module = importlib.import_module(table_module_path)
+            table_class = getattr(table_module, table_class_name)
+        except (ImportError, AttributeError) as e:
+            # remember invalid names so repeated bad requests stay cheap.
+            if (
+                len(global_dict_invalid_table_names)
+                >= global_int_max_invalid_table_names
+            ):
+                global_dict_invalid_table_names.pop(
+                    next(iter(global_dict_invalid_table_names)), None
+                )
+            global_dict_invalid_table_names[local_tuple_key] = str(e)
+            raise LookupError(str(e))
+        table_descriptor = build_table_descriptor(table_class, schema_name)
+        global_dict_table_descriptors[local_tuple_key] = table_descriptor
+        return table_descriptor
+    except Exception:
+        raise
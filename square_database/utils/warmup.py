@@ -0,0 +1,159 @@
+import asyncio
+import importlib
+import time
+from contextlib import AsyncExitStack
+
+from square_database.configuration import (
+    config_bool_enable_async_driver,
+    config_int_db_pool_size,
+    config_int_warmup_connections_per_pool,
+    config_list_db_replicas,
+    config_str_database_module_name,
+    global_object_square_logger,
+)
+from square_database.models.core import ExistsRowsV0, GetRowsV0
+from square_database.utils.database_engines import (
+    get_async_database_engine,
+    get_database_engine,
+)
+from square_database.utils.database_execution import run_blocking
+from square_database.utils.replica_routing import run_read_operation
+from square_database.utils.routes.core import prepare_count_rows, prepare_get_rows
+
+# readiness of the service, flipped once warmup is done (or skipped).
+global_dict_warmup_state = {
+    "ready": False,
+    "duration_seconds": None,
+    "warmed_pool_count": 0,
+    "warmed_table_count": 0,
+    "errors": [],
+}
+
+
+def get_warmup_connection_count():
+    # connections above the pool size would be closed again right away.
+    return max(0, min(config_int_warmup_connections_per_pool, config_int_db_pool_size))
+
+
+def open_pooled_connections(database_name, replica):
+    database_engine = get_database_engine(database_name, replica)
+    local_list_connections = []
+    try:
+        # held together, otherwise the pool hands out the same connection every time.
+        for _ in range(get_warmup_connection_count()):
+            local_list_connections.append(database_engine.connect())
+    finally:
+        for database_connection in local_list_connections:
+            database_connection.close()
+
+
+async def open_async_pooled_connections(database_name, replica):
+    async_database_engine = get_async_database_engine(database_name, replica)
+    async with AsyncExitStack() as exit_stack:
+        for _ in range(get_warmup_connection_count()):
+            await exit_stack.enter_async_context(async_database_engine.connect())
+
+
+def record_warmup_error(target, error):
+    global_object_square_logger.logger.warning(f"warmup of {target} failed: {error}")
+    global_dict_warmup_state["errors"].append(f"{target}: {error}")
+
+
+async def warm_up_table(database_name, schema_name, table_name):
+    # limit 0 compiles and plans the default get_rows shape without reading rows,
+    # exists stops at the first row.
+    table_descriptor, get_rows = await prepare_get_rows(
+        GetRowsV0(
+            database_name=database_name,
+            table_name=table_name,
+            schema_name=schema_name,
+            filters={},
+            apply_filters=False,
+            limit=0,
+        )
+    )
+    await run_read_operation(
+        database_name, table_descriptor.schema_translate_map, get_rows, "replica"
+    )
+    table_descriptor, exists_rows = await prepare_count_rows(
+        ExistsRowsV0(
+            database_name=database_name,
+            table_name=table_name,
+            schema_name=schema_name,
+            filters={},
+            apply_filters=False,
+        ),
+        True,
+    )
+    await run_read_operation(
+        database_name, table_descriptor.schema_translate_map, exists_rows, "replica"
+    )
+
+
+async def warm_up_database(database_entry):
+    try:
+        database_name = database_entry["database"]
+        local_list_schema_entries = database_entry["schemas"]
+    except Exception as e:
+        record_warmup_error(repr(database_entry), e)
+        return
+    for replica in [None, *config_list_db_replicas]:
+        try:
+            if config_bool_enable_async_driver:
+                await open_async_pooled_connections(database_name, replica)
+            else:
+                await run_blocking(open_pooled_connections, database_name, replica)
+            global_dict_warmup_state["warmed_pool_count"] += 1
+        except Exception as e:
+            record_warmup_error(
+                database_name if replica is None else f"{database_name}@{replica}", e
+            )
+    for schema_entry in local_list_schema_entries:
+        try:
+            schema_name = schema_entry["schema"]
+            local_list_tables = schema_entry["base"].metadata.sorted_tables
+        except Exception as e:
+            record_warmup_error(f"{database_name}.{schema_entry!r}", e)
+            continue
+        for table in local_list_tables:
+            try:
+                await warm_up_table(database_name, schema_name, table.name)
+                global_dict_warmup_state["warmed_table_count"] += 1
+            except Exception as e:
+                record_warmup_error(f"{database_name}.{schema_name}.{table.name}", e)
+
+
+@global_object_square_logger.auto_logger()
+async def run_warmup():
+    try:
+        local_float_started_at = time.monotonic()
+        # failures are recorded and skipped, tables are still loaded on first use, so
+        # nothing here keeps the service from becoming ready.
+        try:
+            global_list_create = importlib.import_module(
+                config_str_database_module_name
+            ).main.global_list_create
+        except Exception as e:
+            # database packages are not required to list their databases.
+            record_warmup_error(config_str_database_module_name, e)
+            global_list_create = []
+        await asyncio.gather(
+            *[warm_up_database(database_entry) for database_entry in global_list_create]
+        )
+        global_dict_warmup_state["duration_seconds"] = (
+            time.monotonic() - local_float_started_at
+        )
+        global_dict_warmup_state["ready"] = True
+    except Exception:
+        raise
+
+
+@global_object_square_logger.auto_logger()
+def get_warmup_state():
+    try:
+        return {
+            **global_dict_warmup_state,
+            "errors": list(global_dict_warmup_state["errors"]),
+        }
+    except Exception:
+        raise
@@ -197,3 +197,474 @@ def test_invalid_column_insert(create_client_and_cleanup):
     )
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_invalid_table_is_cached(create_client_and_cleanup):
+    """Test that an invalid table name is rejected consistently once cached"""
+    from square_database.utils.table_descriptors import (
+        global_dict_invalid_table_names,
+    )
+
+    client = create_client_and_cleanup
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "invalid_table",
+        "filters": {},
+        "apply_filters": False,
+    }
+    for _ in range(2):
+        response = client.post("/get_rows/v0", json=payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert messages["INCORRECT_TABLE_NAME"] in response.json()["message"]
+    assert ("square", "public", "invalid_table") in global_dict_invalid_table_names
+
+
+def test_invalid_database_rejected_from_catalog(create_client_and_cleanup):
+    """Test that an unknown database is rejected without opening a pool for it"""
+    from square_database.utils.database_engines import global_dict_database_engines
+
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "invalid_db",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "apply_filters": False,
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["INCORRECT_DATABASE_NAME"] in response.json()["message"]
+    assert "invalid_db" not in global_dict_database_engines
+
+
+def test_get_rows_invalid_datetime_filter(create_client_and_cleanup):
+    """Test getting rows with a value that is not a valid datetime"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {"test_datetime": {"gt": "not_a_datetime"}},
+            "apply_filters": True,
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_admission_queue_full(create_client_and_cleanup, monkeypatch):
+    """Test that a full admission queue fails fast with Retry-After"""
+    import asyncio
+
+    import pytest
+    from fastapi.exceptions import HTTPException
+
+    from square_database.utils import admission_control
+
+    monkeypatch.setattr(
+        admission_control, "config_int_admission_max_concurrency_per_database", 1
+    )
+    monkeypatch.setattr(
+        admission_control, "config_int_admission_max_queue_per_database", 0
+    )
+
+    async def run():
+        async with admission_control.admit_database_request("admission_test"):
+            with pytest.raises(HTTPException) as exc_info:
+                async with admission_control.admit_database_request("admission_test"):
+                    pass
+        return exc_info.value
+
+    he = asyncio.run(run())
+    assert he.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "Retry-After" in he.headers
+    assert messages["DATABASE_BUSY"] in he.detail["message"]
+    metrics = admission_control.get_admission_control_metrics()["admission_test"]
+    assert metrics["rejected_count"] == 1
+    assert metrics["active"] == 0
+
+
+def test_get_rows_invalid_cursor(create_client_and_cleanup):
+    """Test getting rows with a cursor that was not issued by the service"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "apply_filters": False,
+            "cursor": "invalid_cursor",
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_get_rows_cursor_with_offset(create_client_and_cleanup):
+    """Test that cursor pagination cannot be combined with offset"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "apply_filters": False,
+            "use_cursor": True,
+            "offset": 10,
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_get_rows_invalid_count_mode(create_client_and_cleanup):
+    """Test getting rows with an unknown count_mode"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "apply_filters": False,
+            "count_mode": "approximate",
+        },
+    )
+    assert response.status_code == 422
+
+
+def test_get_rows_invalid_column(create_client_and_cleanup):
+    """Test getting rows with an unknown projected column"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "apply_filters": False,
+            "columns": ["test_text", "invalid_column"],
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "invalid_column" in response.json()["log"]
+
+
+def test_get_rows_stream_invalid_filter(create_client_and_cleanup):
+    """Test streaming rows with an invalid filter column"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0/stream",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {"invalid_column": {"eq": 1}},
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_get_rows_stream_with_cursor(create_client_and_cleanup):
+    """Test that streaming rejects cursor pagination"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0/stream",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "apply_filters": False,
+            "use_cursor": True,
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_insert_rows_invalid_upsert(create_client_and_cleanup):
+    """Test upserting with invalid conflict settings"""
+    client = create_client_and_cleanup
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "data": [{"test_text": "example"}],
+    }
+    for upsert, extra in [
+        ({"conflict_columns": ["invalid_column"]}, {}),
+        ({"conflict_columns": ["test_text"]}, {}),
+        ({"conflict_columns": ["test_text"], "update_columns": ["x"]}, {}),
+        (
+            {"conflict_columns": ["test_text"], "update_columns": ["test_bool"]},
+            {"skip_conflicts": True},
+        ),
+    ]:
+        response = client.post(
+            "/insert_rows/v0", json={**payload, **extra, "upsert": upsert}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_batch_rolls_back_on_failure(fixture_all_data_types):
+    """Test that a failing operation rolls back the whole batch"""
+    client = fixture_all_data_types
+    table = {"schema_name": "public", "table_name": "test"}
+    response = client.post(
+        "/batch/v0",
+        json={
+            "database_name": "square",
+            "operations": [
+                {
+                    **table,
+                    "operation": "delete_rows",
+                    "filters": {"test_text": {"eq": "alpha"}},
+                },
+                # duplicate of a unique test_text.
+                {**table, "operation": "insert_rows", "data": [{"test_text": "beta"}]},
+            ],
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["GENERIC_400"] in response.json()["message"]
+    assert response.json()["log"].startswith("operation 1 failed")
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            **table,
+            "filters": {},
+            "apply_filters": False,
+        },
+    )
+    assert response.json()["data"]["total_count"] == 4
+
+
+def test_batch_invalid_operation(create_client_and_cleanup):
+    """Test that an invalid operation rejects the batch before running it"""
+    client = create_client_and_cleanup
+    table = {"schema_name": "public", "table_name": "test"}
+    response = client.post(
+        "/batch/v0",
+        json={
+            "database_name": "square",
+            "operations": [
+                {**table, "operation": "insert_rows", "data": [{"test_text": "a"}]},
+                {
+                    "schema_name": "public",
+                    "table_name": "invalid_table",
+                    "operation": "delete_rows",
+                    "filters": {},
+                },
+            ],
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["INCORRECT_TABLE_NAME"] in response.json()["message"]
+    assert response.json()["log"].startswith("operation 1:")
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            **table,
+            "filters": {},
+            "apply_filters": False,
+        },
+    )
+    assert response.json()["data"]["total_count"] == 0
+
+
+def test_get_rows_invalid_filter_tree_column(create_client_and_cleanup):
+    """Test filtering on an invalid column inside a filter tree"""
+    client = create_client_and_cleanup
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {},
+            "filter_tree": {"or_": [{"filters": {"invalid_column": {"eq": 1}}}]},
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_aggregate_rows_invalid_request(create_client_and_cleanup):
+    """Test aggregating with invalid columns, functions and references"""
+    client = create_client_and_cleanup
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+    }
+    for extra in [
+        {"aggregates": [{"function": "sum", "column": "invalid_column"}]},
+        {"aggregates": [{"function": "sum"}]},
+        {"aggregates": [{"function": "count"}, {"function": "count"}]},
+        {
+            "group_by": [{"column": "test_text"}],
+            "aggregates": [{"function": "count"}],
+            "having": {"test_text": {"eq": "a"}},
+        },
+        {
+            "group_by": [{"column": "test_text", "date_trunc": "day"}],
+            "aggregates": [{"function": "count"}],
+        },
+        {"aggregates": [{"function": "count"}], "order_by": ["invalid_output"]},
+        # postgres cannot sum text.
+        {"aggregates": [{"function": "sum", "column": "test_text"}]},
+    ]:
+        response = client.post("/aggregate_rows/v0", json={**payload, **extra})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert messages["GENERIC_400"] in response.json()["message"]
+
+
+def test_count_rows_invalid_request(create_client_and_cleanup):
+    """Test counting with an invalid filter column or cap"""
+    client = create_client_and_cleanup
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    for path in ["/exists_rows/v0", "/count_rows/v0"]:
+        response = client.post(
+            path, json={**payload, "filters": {"invalid_column": {"eq": 1}}}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert messages["GENERIC_400"] in response.json()["message"]
+    response = client.post("/count_rows/v0", json={**payload, "filters": {}, "cap": 0})
+    assert response.status_code == 422
+
+
+def test_ready_during_warmup(create_client_and_cleanup, monkeypatch):
+    """Test readiness before the startup warmup has finished"""
+    from square_database.utils import warmup
+
+    client = create_client_and_cleanup
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "ready", False)
+    response = client.get("/ready/v0")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["message"] == messages["SERVICE_NOT_READY"]
+
+
+def test_get_rows_database_unavailable(create_client_and_cleanup, monkeypatch):
+    """Test a connection error on an existing database keeps its pool and catalog"""
+    from sqlalchemy.exc import OperationalError
+
+    from square_database.utils import database_catalog, database_engines
+    from square_database.utils.routes import core
+
+    client = create_client_and_cleanup
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+    }
+    assert client.post("/get_rows/v0", json=payload).status_code == 200
+    database_engines_before = (
+        dict(database_engines.global_dict_database_engines),
+        dict(database_engines.global_dict_async_database_engines),
+    )
+
+    async def run_read_operation(*args, **kwargs):
+        raise OperationalError(
+            "SELECT 1", {}, Exception("sorry, too many clients already")
+        )
+
+    monkeypatch.setattr(core, "run_read_operation", run_read_operation)
+    response = client.post("/get_rows/v0", json=payload)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["message"] == messages["DATABASE_UNAVAILABLE"]
+    assert "Retry-After" in response.headers
+    assert (
+        database_engines.global_dict_database_engines,
+        database_engines.global_dict_async_database_engines,
+    ) == database_engines_before
+    assert "square" in database_catalog.global_dict_schema_catalog
+
+
+def test_warmup_without_database_list(create_client_and_cleanup, monkeypatch):
+    """Test warmup with a database package that does not list its databases"""
+    import asyncio
+
+    from square_database.utils import warmup
+
+    monkeypatch.setattr(
+        warmup, "config_str_database_module_name", "square_database.models"
+    )
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "ready", False)
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "warmed_table_count", 0)
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "errors", [])
+    asyncio.run(warmup.run_warmup())
+    warmup_state = warmup.get_warmup_state()
+    assert warmup_state["ready"] is True
+    assert warmup_state["warmed_table_count"] == 0
+    assert len(warmup_state["errors"]) == 1
+    assert warmup_state["errors"][0].startswith("square_database.models: ")
+
+
+def test_delete_rows_empty_filter_tree(fixture_all_data_types):
+    """Test deleting with filter trees that carry no condition"""
+    client = fixture_all_data_types
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    for filter_tree in [{}, {"or_": []}, {"not_": {}}, {"and_": [{}]}]:
+        response = client.post(
+            "/delete_rows/v0",
+            json={**payload, "filters": {}, "filter_tree": filter_tree},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["data"]["affected_count"] == 0
+    response = client.post(
+        "/count_rows/v0", json={**payload, "filters": {}, "apply_filters": False}
+    )
+    assert response.json()["data"]["total_count"] == 4
+
+
+def test_edit_rows_empty_filter_tree(fixture_all_data_types):
+    """Test editing with filter trees that carry no condition"""
+    client = fixture_all_data_types
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    for filter_tree in [{}, {"or_": []}, {"not_": {}}]:
+        response = client.patch(
+            "/edit_rows/v0",
+            json={
+                **payload,
+                "filters": {},
+                "filter_tree": filter_tree,
+                "data": {"test_text": "overwritten"},
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["data"]["affected_count"] == 0
+    # an empty or_ next to a condition still matches nothing.
+    response = client.patch(
+        "/edit_rows/v0",
+        json={
+            **payload,
+            "filters": {"test_text": {"eq": "alpha"}},
+            "filter_tree": {"or_": []},
+            "data": {"test_text": "overwritten"},
+        },
+    )
+    assert response.json()["data"]["affected_count"] == 0
+    response = client.post(
+        "/count_rows/v0",
+        json={**payload, "filters": {"test_text": {"eq": "overwritten"}}},
+    )
+    assert response.json()["data"]["total_count"] == 0
@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 
 from square_commons import get_api_output_in_standard_format
 from square_database_structure.square.public.enums import TestEnumEnum
+from square_database.messages import messages
 
 
 def test_database_creation(create_client_and_cleanup):
@@ -242,3 +243,1152 @@ def test_delete_rows(create_client_and_cleanup, fixture_delete_rows):
     assert get_response.status_code == 200
     data = get_response.json()["data"]["main"]
     assert len(data) == 0
+
+
+def test_database_engine_is_reused(
+    get_patched_configuration, create_client_and_cleanup, fixture_get_rows
+):
+    from square_database.utils import database_engines
+
+    # only the engine kind in use gets a pool, the catalog queries share it.
+    if get_patched_configuration.config_bool_enable_async_driver:
+        global_dict_engines = database_engines.global_dict_async_database_engines
+        global_dict_other_engines = database_engines.global_dict_database_engines
+    else:
+        global_dict_engines = database_engines.global_dict_database_engines
+        global_dict_other_engines = database_engines.global_dict_async_database_engines
+    client = create_client_and_cleanup
+    client.post("/refresh_catalog/v0")
+    client.post("/get_rows/v0", json=fixture_get_rows)
+    database_engine = global_dict_engines["square"]
+    client.post("/get_rows/v0", json=fixture_get_rows)
+    assert global_dict_engines["square"] is database_engine
+    assert "square" not in global_dict_other_engines
+
+
+def test_table_descriptor_is_cached(create_client_and_cleanup):
+    from square_database.utils.table_descriptors import get_table_descriptor
+
+    table_descriptor = get_table_descriptor("square", "public", "test")
+    assert get_table_descriptor("square", "public", "test") is table_descriptor
+    assert table_descriptor.primary_key_column_names == ("test_id",)
+    assert "test_enum_enum" in table_descriptor.enum_column_names
+    assert "test_text" in table_descriptor.column_names
+
+
+def test_refresh_catalog(create_client_and_cleanup, fixture_get_rows):
+    client = create_client_and_cleanup
+    response = client.post("/refresh_catalog/v0")
+    assert response.status_code == 200
+    response = client.post("/get_rows/v0", json=fixture_get_rows)
+    assert response.status_code == 200
+    assert response.json()["data"]["total_count"] == 1
+
+
+def test_metrics(create_client_and_cleanup, fixture_get_rows):
+    client = create_client_and_cleanup
+    client.post("/get_rows/v0", json=fixture_get_rows)
+    response = client.get("/metrics/v0")
+    assert response.status_code == 200
+    admission_control = response.json()["data"]["main"]["admission_control"]
+    assert admission_control["square"]["admitted_count"] >= 1
+    assert admission_control["square"]["active"] == 0
+
+
+def test_get_rows_with_cursor(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+        "order_by": ["-test_float"],
+        "limit": 2,
+        "use_cursor": True,
+    }
+    response = client.post("/get_rows/v0", json=payload)
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["test_text"] for row in data["main"]] == ["delta", "gamma"]
+    assert data["total_count"] == 4
+    assert data["next_cursor"] is not None
+
+    response = client.post(
+        "/get_rows/v0", json={**payload, "cursor": data["next_cursor"]}
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["test_text"] for row in data["main"]] == ["beta", "alpha"]
+    assert data["next_cursor"] is None
+
+
+def test_get_rows_with_cursor_mixed_order(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+        "order_by": ["test_bool", "-test_datetime"],
+        "limit": 1,
+        "use_cursor": True,
+    }
+    seen = []
+    while True:
+        response = client.post("/get_rows/v0", json=payload)
+        assert response.status_code == 200
+        data = response.json()["data"]
+        seen.extend(row["test_text"] for row in data["main"])
+        if data["next_cursor"] is None:
+            break
+        payload["cursor"] = data["next_cursor"]
+    assert seen == ["delta", "beta", "gamma", "alpha"]
+
+
+def test_get_rows_count_modes(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {"test_bool": {"eq": True}},
+        "limit": 1,
+    }
+    response = client.post("/get_rows/v0", json=payload)
+    assert response.status_code == 200
+    assert len(response.json()["data"]["main"]) == 1
+    assert response.json()["data"]["total_count"] == 2
+
+    response = client.post("/get_rows/v0", json={**payload, "offset": 10})
+    assert response.status_code == 200
+    assert response.json()["data"]["main"] == []
+    assert response.json()["data"]["total_count"] == 2
+
+    # limit 0 only reads the count.
+    response = client.post("/get_rows/v0", json={**payload, "limit": 0})
+    assert response.status_code == 200
+    assert response.json()["data"]["main"] == []
+    assert response.json()["data"]["total_count"] == 2
+
+    response = client.post("/get_rows/v0", json={**payload, "count_mode": "none"})
+    assert response.status_code == 200
+    assert len(response.json()["data"]["main"]) == 1
+    assert response.json()["data"]["total_count"] is None
+
+    for apply_filters in (True, False):
+        response = client.post(
+            "/get_rows/v0",
+            json={
+                **payload,
+                "apply_filters": apply_filters,
+                "count_mode": "estimated",
+            },
+        )
+        assert response.status_code == 200
+        assert len(response.json()["data"]["main"]) == 1
+        assert isinstance(response.json()["data"]["total_count"], int)
+        assert response.json()["data"]["total_count"] >= 0
+
+
+def test_get_rows_with_columns(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+        "columns": ["test_text", "test_bool"],
+        "order_by": ["-test_float"],
+        "limit": 2,
+    }
+    response = client.post("/get_rows/v0", json=payload)
+    assert response.status_code == 200
+    assert response.json()["data"]["main"] == [
+        {"test_text": "delta", "test_bool": False},
+        {"test_text": "gamma", "test_bool": True},
+    ]
+
+    # cursor keys that were not requested are not returned.
+    response = client.post("/get_rows/v0", json={**payload, "use_cursor": True})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [sorted(row) for row in data["main"]] == [["test_bool", "test_text"]] * 2
+    response = client.post(
+        "/get_rows/v0", json={**payload, "cursor": data["next_cursor"]}
+    )
+    assert response.status_code == 200
+    assert [row["test_text"] for row in response.json()["data"]["main"]] == [
+        "beta",
+        "alpha",
+    ]
+
+
+def test_get_rows_serialization(fixture_all_data_types):
+    client = fixture_all_data_types
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {"test_text": {"eq": "gamma"}},
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    row = response.json()["data"]["main"][0]
+    assert row["test_enum_enum"] == TestEnumEnum.COMPLETED.value
+    # same text as str(datetime), which the previous json round trip produced.
+    assert row["test_datetime"] == str(datetime.fromisoformat(row["test_datetime"]))
+    assert row["test_bool"] is True
+    assert row["test_float"] == 30.1
+    assert row["test_json"] == {"key": "value_3", "id": 3}
+    assert row["test_blob"] is None
+
+
+def test_get_rows_serialization_big_integer(create_client_and_cleanup):
+    import json
+
+    client = create_client_and_cleanup
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    # json columns hold integers orjson cannot encode.
+    rows = [{"test_text": "big_integer", "test_json": {"big": 2**70}}]
+    response = client.post("/insert_rows/v0", json={**payload, "data": rows})
+    assert response.status_code == 201
+
+    read_payload = {**payload, "filters": {}, "apply_filters": False}
+    response = client.post("/get_rows/v0", json=read_payload)
+    assert response.status_code == 200
+    assert response.json()["data"]["main"][0]["test_json"] == {"big": 2**70}
+    response = client.post("/get_rows/v0/stream", json=read_payload)
+    assert response.status_code == 200
+    assert json.loads(response.text)["test_json"] == {"big": 2**70}
+
+    response = client.post("/delete_rows/v0", json=read_payload)
+    assert response.json()["data"]["affected_count"] == 1
+
+
+def test_get_rows_stream(fixture_all_data_types, monkeypatch):
+    import json
+
+    from square_database.utils import database_execution
+
+    # one row per chunk, so the response is built from several fetches.
+    monkeypatch.setattr(database_execution, "config_int_stream_chunk_size", 1)
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+        "columns": ["test_text", "test_enum_enum"],
+        "order_by": ["test_float"],
+    }
+    response = client.post("/get_rows/v0/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["test_text"] for row in rows] == ["alpha", "beta", "gamma", "delta"]
+    assert rows[2] == {
+        "test_text": "gamma",
+        "test_enum_enum": TestEnumEnum.COMPLETED.value,
+    }
+
+    response = client.post(
+        "/get_rows/v0/stream", json={**payload, "limit": 2, "offset": 1}
+    )
+    assert response.status_code == 200
+    assert [json.loads(line)["test_text"] for line in response.text.splitlines()] == [
+        "beta",
+        "gamma",
+    ]
+
+    response = client.post(
+        "/get_rows/v0/stream",
+        json={
+            **payload,
+            "filters": {"test_text": {"eq": "missing"}},
+            "apply_filters": True,
+        },
+    )
+    assert response.status_code == 200
+    assert response.text == ""
+    # the admission slot is held for the whole stream and released afterwards.
+    response = client.get("/metrics/v0")
+    assert response.json()["data"]["main"]["admission_control"]["square"]["active"] == 0
+
+
+def test_get_rows_stream_client_disconnect(fixture_all_data_types):
+    import asyncio
+
+    from square_database.models.core import GetRowsV0
+    from square_database.utils import admission_control
+    from square_database.utils.routes.core import util_get_rows_stream_v0
+
+    async def stream_to_gone_client():
+        response = await util_get_rows_stream_v0(
+            GetRowsV0(
+                database_name="square",
+                schema_name="public",
+                table_name="test",
+                filters={},
+                apply_filters=False,
+            )
+        )
+        admission_state = admission_control.get_admission_state("square")
+        assert admission_state["active"] == 1
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                raise OSError("client went away")
+
+        try:
+            await response(
+                {"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send
+            )
+        except Exception:
+            pass
+        # released before the body was read, not left to garbage collection.
+        return admission_state["active"]
+
+    assert asyncio.run(stream_to_gone_client()) == 0
+
+
+def test_edit_rows_set_based(fixture_all_data_types):
+    client = fixture_all_data_types
+    new_datetime = datetime(2030, 1, 2, 3, 4, 5)
+    response = client.patch(
+        "/edit_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {"test_bool": {"eq": False}},
+            "data": {
+                "test_enum_enum": TestEnumEnum.COMPLETED.value,
+                "test_datetime": new_datetime.isoformat(),
+            },
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["affected_count"] == 2
+    assert sorted(row["test_text"] for row in data["main"]) == ["beta", "delta"]
+    assert all(
+        row["test_enum_enum"] == TestEnumEnum.COMPLETED.value
+        and row["test_datetime"] == str(new_datetime)
+        for row in data["main"]
+    )
+
+    # an empty data object edits nothing and returns the matching rows.
+    response = client.patch(
+        "/edit_rows/v0",
+        json={
+            "database_name": "square",
+            "schema_name": "public",
+            "table_name": "test",
+            "filters": {"test_text": {"eq": "alpha"}},
+            "data": {},
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["data"]["affected_count"] == 1
+    assert response.json()["data"]["main"][0]["test_enum_enum"] == (
+        TestEnumEnum.PENDING.value
+    )
+
+
+def test_delete_rows_set_based(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+    }
+    # empty filters with apply_filters delete nothing.
+    response = client.post("/delete_rows/v0", json={**payload, "filters": {}})
+    assert response.status_code == 200
+    assert response.json()["data"]["affected_count"] == 0
+    response = client.post(
+        "/get_rows/v0", json={**payload, "filters": {}, "apply_filters": False}
+    )
+    assert response.json()["data"]["total_count"] == 4
+
+    response = client.post(
+        "/delete_rows/v0", json={**payload, "filters": {"test_float": {"gt": 25}}}
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["affected_count"] == 2
+    assert sorted(row["test_text"] for row in data["main"]) == ["delta", "gamma"]
+    assert {row["test_enum_enum"] for row in data["main"]} == {
+        TestEnumEnum.COMPLETED.value,
+        TestEnumEnum.RUNNING.value,
+    }
+    response = client.post(
+        "/get_rows/v0", json={**payload, "filters": {}, "apply_filters": False}
+    )
+    assert response.json()["data"]["total_count"] == 2
+
+
+def test_insert_rows_in_bulk(create_client_and_cleanup, monkeypatch):
+    from square_database.utils import bulk_insert
+
+    client = create_client_and_cleanup
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+
+    def make_rows(prefix, count):
+        return [
+            {
+                "test_text": f"{prefix}\t{index}\n\\",
+                "test_datetime": datetime(2024, 1, 1, 0, 0, index).isoformat(),
+                "test_bool": index % 2 == 0,
+                "test_enum_enum": TestEnumEnum.RUNNING.value,
+                "test_float": index / 2,
+                "test_json": {"index": index, "nested": [prefix]},
+            }
+            for index in range(count)
+        ]
+
+    def check(response, rows):
+        assert response.status_code == 201
+        data = response.json()["data"]
+        assert data["affected_count"] == len(rows)
+        assert [row["test_text"] for row in data["main"]] == [
+            row["test_text"] for row in rows
+        ]
+        for returned, sent in zip(data["main"], rows):
+            assert returned["test_datetime"] == str(
+                datetime.fromisoformat(sent["test_datetime"])
+            )
+            assert returned["test_bool"] == sent["test_bool"]
+            assert returned["test_enum_enum"] == sent["test_enum_enum"]
+            assert returned["test_float"] == sent["test_float"]
+            assert returned["test_json"] == sent["test_json"]
+            assert returned["test_blob"] is None
+
+    # paged multi row inserts.
+    monkeypatch.setattr(bulk_insert, "config_int_insert_page_size", 2)
+    rows = make_rows("paged", 5)
+    check(client.post("/insert_rows/v0", json={**payload, "data": rows}), rows)
+
+    # COPY into a staging table, null values and conflicts included.
+    monkeypatch.setattr(bulk_insert, "config_int_insert_copy_threshold", 3)
+    copy_calls = []
+    original_insert_rows_with_copy = bulk_insert.insert_rows_with_copy
+
+    def counting_insert_rows_with_copy(*args, **kwargs):
+        copy_calls.append(len(args[3]))
+        return original_insert_rows_with_copy(*args, **kwargs)
+
+    monkeypatch.setattr(
+        bulk_insert, "insert_rows_with_copy", counting_insert_rows_with_copy
+    )
+    rows = make_rows("copied", 4)
+    rows[1]["test_float"] = None
+    check(client.post("/insert_rows/v0", json={**payload, "data": rows}), rows)
+    response = client.post(
+        "/insert_rows/v0",
+        json={
+            **payload,
+            "data": rows[:2] + make_rows("fresh", 2),
+            "skip_conflicts": True,
+        },
+    )
+    check(response, make_rows("fresh", 2))
+    response = client.post("/insert_rows/v0", json={**payload, "data": rows})
+    assert response.status_code == 400
+    assert copy_calls == [4, 4, 4]
+
+    response = client.post(
+        "/delete_rows/v0", json={**payload, "filters": {}, "apply_filters": False}
+    )
+    assert response.json()["data"]["affected_count"] == 11
+
+
+def test_insert_rows_json_null_with_copy(create_client_and_cleanup, monkeypatch):
+    from square_database.utils import bulk_insert
+
+    client = create_client_and_cleanup
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+
+    def insert_and_read(test_text, copy_threshold):
+        monkeypatch.setattr(
+            bulk_insert, "config_int_insert_copy_threshold", copy_threshold
+        )
+        rows = [{"test_text": test_text, "test_json": None}]
+        response = client.post("/insert_rows/v0", json={**payload, "data": rows})
+        assert response.status_code == 201
+        response = client.post(
+            "/get_rows/v0",
+            json={
+                **payload,
+                "filters": {
+                    "test_text": {"eq": test_text},
+                    "test_json": {"is_null": True},
+                },
+            },
+        )
+        return response.json()["data"]["total_count"]
+
+    # the same row is stored the same way above and below the COPY threshold.
+    assert insert_and_read("json_null_executemany", 10000) == insert_and_read(
+        "json_null_copy", 1
+    )
+
+    response = client.post(
+        "/delete_rows/v0", json={**payload, "filters": {}, "apply_filters": False}
+    )
+    assert response.json()["data"]["affected_count"] == 2
+
+
+def test_insert_rows_upsert(fixture_all_data_types, monkeypatch):
+    from square_database.utils import bulk_insert
+
+    client = fixture_all_data_types
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    rows = [
+        {"test_text": "alpha", "test_float": 1.0, "test_bool": False},
+        {"test_text": "epsilon", "test_float": 2.0, "test_bool": True},
+    ]
+    response = client.post(
+        "/insert_rows/v0",
+        json={**payload, "data": rows, "upsert": {"conflict_columns": ["test_text"]}},
+    )
+    assert response.status_code == 201
+    data = response.json()["data"]
+    assert data["affected_count"] == 2
+    assert [(row["test_text"], row["test_float"]) for row in data["main"]] == [
+        ("alpha", 1.0),
+        ("epsilon", 2.0),
+    ]
+    # columns that were not sent are left alone.
+    assert data["main"][0]["test_enum_enum"] == TestEnumEnum.PENDING.value
+
+    # only update_columns change, through the COPY path as well.
+    monkeypatch.setattr(bulk_insert, "config_int_insert_copy_threshold", 2)
+    rows = [
+        {"test_text": "alpha", "test_float": 3.0, "test_bool": True},
+        {"test_text": "zeta", "test_float": 4.0, "test_bool": True},
+    ]
+    response = client.post(
+        "/insert_rows/v0",
+        json={
+            **payload,
+            "data": rows,
+            "upsert": {
+                "conflict_columns": ["test_text"],
+                "update_columns": ["test_float"],
+            },
+        },
+    )
+    assert response.status_code == 201
+    data = response.json()["data"]
+    assert [
+        (row["test_text"], row["test_float"], row["test_bool"]) for row in data["main"]
+    ] == [("alpha", 3.0, False), ("zeta", 4.0, True)]
+
+    response = client.post(
+        "/get_rows/v0", json={**payload, "filters": {}, "apply_filters": False}
+    )
+    assert response.json()["data"]["total_count"] == 6
+
+    # an update column missing from a row would overwrite the stored value with null.
+    response = client.post(
+        "/insert_rows/v0",
+        json={
+            **payload,
+            "data": [
+                {"test_text": "alpha", "test_float": 5.0, "test_bool": True},
+                {"test_text": "zeta", "test_float": 6.0},
+            ],
+            "upsert": {
+                "conflict_columns": ["test_text"],
+                "update_columns": ["test_float", "test_bool"],
+            },
+        },
+    )
+    assert response.status_code == 400
+    response = client.post(
+        "/get_rows/v0",
+        json={**payload, "filters": {"test_text": {"eq": "zeta"}}},
+    )
+    assert response.json()["data"]["main"][0]["test_bool"] is True
+
+
+def test_batch(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    table = {"schema_name": "public", "table_name": "test"}
+    response = client.post(
+        "/batch/v0",
+        json={
+            "database_name": "square",
+            "operations": [
+                {
+                    **table,
+                    "operation": "insert_rows",
+                    "data": [{"test_text": "epsilon", "test_float": 50.0}],
+                },
+                {
+                    **table,
+                    "operation": "edit_rows",
+                    "filters": {"test_text": {"eq": "epsilon"}},
+                    "data": {"test_float": 55.5},
+                },
+                {
+                    **table,
+                    "operation": "delete_rows",
+                    "filters": {"test_float": {"lt": 25}},
+                },
+            ],
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [result["operation"] for result in data["main"]] == [
+        "insert_rows",
+        "edit_rows",
+        "delete_rows",
+    ]
+    assert [result["affected_count"] for result in data["main"]] == [1, 1, 2]
+    assert data["affected_count"] == 4
+    # the edit sees the row inserted earlier in the same transaction.
+    assert data["main"][1]["main"][0]["test_float"] == 55.5
+    assert sorted(row["test_text"] for row in data["main"][2]["main"]) == [
+        "alpha",
+        "beta",
+    ]
+    response = client.post(
+        "/get_rows/v0",
+        json={
+            **payload,
+            "filters": {},
+            "apply_filters": False,
+            "order_by": ["test_id"],
+        },
+    )
+    assert [row["test_text"] for row in response.json()["data"]["main"]] == [
+        "gamma",
+        "delta",
+        "epsilon",
+    ]
+
+
+def test_get_rows_many(fixture_all_data_types, monkeypatch):
+    from square_database.utils.routes import core
+
+    monkeypatch.setattr(core, "config_int_get_rows_many_max_concurrency", 2)
+    client = fixture_all_data_types
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    response = client.post(
+        "/get_rows_many/v0",
+        json={
+            "queries": {
+                "all": {**payload, "filters": {}, "apply_filters": False},
+                "running": {
+                    **payload,
+                    "filters": {"test_enum_enum": {"eq": "RUNNING"}},
+                    "columns": ["test_text"],
+                },
+                "invalid": {**payload, "table_name": "invalid_table", "filters": {}},
+            }
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]["main"]
+    assert list(data) == ["all", "running", "invalid"]
+    assert data["all"]["status_code"] == 200
+    assert data["all"]["data"]["total_count"] == 4
+    assert data["running"]["data"]["main"] == [{"test_text": "delta"}]
+    # a failing query only fails its own entry.
+    assert data["invalid"]["status_code"] == 400
+    assert data["invalid"]["message"] == messages["INCORRECT_TABLE_NAME"]
+
+
+def test_get_rows_statement_cache(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "columns": ["test_text"],
+        "order_by": ["test_float"],
+        "limit": 10,
+    }
+
+    def get_metrics():
+        response = client.get("/metrics/v0")
+        return response.json()["data"]["main"]["statement_cache"]
+
+    response = client.post(
+        "/get_rows/v0", json={**payload, "filters": {"test_float": {"gt": 25}}}
+    )
+    assert [row["test_text"] for row in response.json()["data"]["main"]] == [
+        "gamma",
+        "delta",
+    ]
+    metrics = get_metrics()
+    # same shape with other values reuses the statement and binds the new values.
+    for value, limit, expected in [
+        (15, 10, ["beta", "gamma", "delta"]),
+        (15, 1, ["beta"]),
+        (50, 10, []),
+    ]:
+        response = client.post(
+            "/get_rows/v0",
+            json={**payload, "limit": limit, "filters": {"test_float": {"gt": value}}},
+        )
+        data = response.json()["data"]
+        assert [row["test_text"] for row in data["main"]] == expected
+        assert data["total_count"] == (3 if value == 15 else 0)
+    assert get_metrics()["hit_count"] == metrics["hit_count"] + 3
+    assert get_metrics()["miss_count"] == metrics["miss_count"]
+
+    # a different operator is a different shape.
+    response = client.post(
+        "/get_rows/v0",
+        json={**payload, "filters": {"test_float": {"in_": [10.5, 40.99]}}},
+    )
+    assert [row["test_text"] for row in response.json()["data"]["main"]] == [
+        "alpha",
+        "delta",
+    ]
+    assert get_metrics()["miss_count"] == metrics["miss_count"] + 1
+    assert 0 < get_metrics()["hit_rate"] <= 1
+
+
+def test_get_rows_read_replicas(
+    get_patched_configuration, fixture_all_data_types, monkeypatch
+):
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from square_database import main
+    from square_database.utils import replica_routing
+
+    # the primary doubles as a replica, the second one is unreachable.
+    replica = (
+        f"{get_patched_configuration.config_str_db_ip}:"
+        f"{get_patched_configuration.config_int_db_port}"
+    )
+    unreachable_replica = "127.0.0.1:1"
+    monkeypatch.setattr(
+        replica_routing, "config_list_db_replicas", [replica, unreachable_replica]
+    )
+    monkeypatch.setattr(replica_routing, "global_dict_replica_states", {})
+    monkeypatch.setattr(main, "config_bool_enable_warmup", False)
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+    }
+
+    # background checks need the event loop to outlive a single request.
+    with TestClient(main.app) as client:
+
+        def get_metrics():
+            response = client.get("/metrics/v0")
+            return response.json()["data"]["main"]["read_replicas"]
+
+        def wait_for_checks():
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and any(
+                replica_state["checking"]
+                for replica_state in replica_routing.global_dict_replica_states.values()
+            ):
+                time.sleep(0.01)
+
+        # the first read schedules the checks and goes to the primary meanwhile.
+        response = client.post("/get_rows/v0", json=payload)
+        assert response.json()["data"]["total_count"] == 4
+        wait_for_checks()
+        for _ in range(2):
+            response = client.post("/get_rows/v0", json=payload)
+            assert response.json()["data"]["total_count"] == 4
+        metrics = get_metrics()
+        assert metrics[replica]["healthy"] is True
+        assert metrics[replica]["lag_seconds"] == 0
+        assert metrics[replica]["routed_count"] == 2
+        assert metrics[unreachable_replica]["healthy"] is False
+        assert metrics[unreachable_replica]["last_error"]
+        assert metrics[unreachable_replica]["routed_count"] == 0
+
+        # primary consistency skips the replicas.
+        response = client.post(
+            "/get_rows/v0", json={**payload, "consistency": "primary"}
+        )
+        assert response.json()["data"]["total_count"] == 4
+        assert get_metrics()[replica]["routed_count"] == 2
+
+        # replicas lagging beyond the threshold are ejected, reads go to the primary.
+        monkeypatch.setattr(replica_routing, "config_float_replica_max_lag_seconds", -1)
+        monkeypatch.setattr(
+            replica_routing, "config_float_replica_check_interval_seconds", 0
+        )
+        response = client.post("/get_rows/v0", json=payload)
+        assert response.json()["data"]["total_count"] == 4
+        wait_for_checks()
+        response = client.post("/get_rows/v0", json=payload)
+        assert response.json()["data"]["total_count"] == 4
+        metrics = get_metrics()
+        assert metrics[replica]["healthy"] is False
+        assert metrics[replica]["ejected_count"] == 1
+        assert metrics[replica]["routed_count"] == 3
+
+
+def test_get_rows_result_cache(fixture_all_data_types, monkeypatch):
+    import collections
+
+    from square_database.utils import result_cache
+
+    monkeypatch.setattr(result_cache, "config_int_result_cache_max_bytes", 1_000_000)
+    monkeypatch.setattr(
+        result_cache, "global_dict_result_cache", collections.OrderedDict()
+    )
+    monkeypatch.setattr(
+        result_cache,
+        "global_dict_result_cache_table_keys",
+        collections.defaultdict(set),
+    )
+    monkeypatch.setattr(
+        result_cache,
+        "global_dict_result_cache_table_versions",
+        collections.defaultdict(int),
+    )
+    monkeypatch.setattr(
+        result_cache,
+        "global_dict_result_cache_counters",
+        dict.fromkeys(result_cache.global_dict_result_cache_counters, 0),
+    )
+    client = fixture_all_data_types
+    table = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+    payload = {**table, "filters": {"test_text": {"eq": "alpha"}}}
+
+    def get_metrics():
+        response = client.get("/metrics/v0")
+        return response.json()["data"]["main"]["result_cache"]
+
+    first_response = client.post("/get_rows/v0", json=payload)
+    second_response = client.post("/get_rows/v0", json=payload)
+    assert second_response.json() == first_response.json()
+    metrics = get_metrics()
+    assert (metrics["hit_count"], metrics["miss_count"], metrics["size"]) == (1, 1, 1)
+    assert metrics["size_bytes"] == len(first_response.content)
+
+    # primary reads bypass the cache.
+    client.post("/get_rows/v0", json={**payload, "consistency": "primary"})
+    assert get_metrics()["hit_count"] == 1
+
+    # a write to the table drops its cached results.
+    client.patch(
+        "/edit_rows/v0",
+        json={**payload, "data": {"test_float": 99.5}},
+    )
+    assert get_metrics()["invalidation_count"] == 1
+    response = client.post("/get_rows/v0", json=payload)
+    assert response.json()["data"]["main"][0]["test_float"] == 99.5
+    assert get_metrics()["miss_count"] == 2
+
+    # the byte bound evicts the least recently used result.
+    monkeypatch.setattr(
+        result_cache, "config_int_result_cache_max_bytes", len(response.content) + 10
+    )
+    client.post(
+        "/get_rows/v0", json={**table, "filters": {"test_text": {"eq": "beta"}}}
+    )
+    metrics = get_metrics()
+    assert (metrics["size"], metrics["eviction_count"]) == (1, 1)
+
+    # a stale index entry does not turn a committed write into an error.
+    result_cache.global_dict_result_cache_table_keys[("square", "public", "test")].add(
+        b"stale"
+    )
+    response = client.patch(
+        "/edit_rows/v0",
+        json={**payload, "data": {"test_float": 10.5}},
+    )
+    assert response.status_code == 200
+
+    # excluded tables are not cached.
+    monkeypatch.setattr(
+        result_cache,
+        "config_list_result_cache_excluded_tables",
+        ["square.public.test"],
+    )
+    client.post("/get_rows/v0", json=payload)
+    client.post("/get_rows/v0", json=payload)
+    assert get_metrics()["hit_count"] == 1
+
+
+def test_single_flight(create_client_and_cleanup, monkeypatch):
+    import asyncio
+
+    from square_database.utils import single_flight
+
+    monkeypatch.setattr(single_flight, "global_dict_in_flight_reads", {})
+    monkeypatch.setattr(
+        single_flight,
+        "global_dict_single_flight_counters",
+        dict.fromkeys(single_flight.global_dict_single_flight_counters, 0),
+    )
+    client = create_client_and_cleanup
+    local_list_calls = []
+
+    async def read():
+        local_list_calls.append(None)
+        await asyncio.sleep(0.05)
+        return len(local_list_calls)
+
+    async def run_requests():
+        leader = asyncio.ensure_future(single_flight.run_single_flight("key", read))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.ensure_future(single_flight.run_single_flight("key", read))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        # the leader going away does not cancel the shared read.
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        # once finished, the next identical read runs again.
+        results.append(await single_flight.run_single_flight("key", read))
+        return results
+
+    assert asyncio.run(run_requests()) == [1, 1, 1, 2]
+    assert single_flight.global_dict_in_flight_reads == {}
+    response = client.get("/metrics/v0")
+    metrics = response.json()["data"]["main"]["single_flight"]
+    assert (metrics["leader_count"], metrics["follower_count"]) == (2, 3)
+    assert metrics["coalesced_rate"] == 0.6
+
+
+def test_get_rows_filter_operators_and_tree(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "order_by": ["test_float"],
+    }
+
+    def get_texts(**kwargs):
+        response = client.post("/get_rows/v0", json={**payload, **kwargs})
+        assert response.status_code == 200
+        return [row["test_text"] for row in response.json()["data"]["main"]]
+
+    # every operator set on a column applies.
+    assert get_texts(filters={"test_float": {"gte": 20, "lt": 40}}) == [
+        "beta",
+        "gamma",
+    ]
+    assert get_texts(filters={"test_float": {"gt": 10, "ne": 20, "lte": 40.99}}) == [
+        "alpha",
+        "gamma",
+        "delta",
+    ]
+
+    tree = {
+        "or_": [
+            {"filters": {"test_text": {"eq": "alpha"}}},
+            {
+                "and_": [
+                    {"filters": {"test_bool": {"eq": False}}},
+                    {"filters": {"test_enum_enum": {"eq": "RUNNING"}}},
+                ]
+            },
+        ],
+        "not_": {"filters": {"test_float": {"gt": 40}}},
+    }
+    # empty filters with a tree are not short circuited.
+    assert get_texts(filters={}, filter_tree=tree) == ["alpha"]
+    tree["not_"]["filters"]["test_float"]["gt"] = 50
+    assert get_texts(filters={}, filter_tree=tree) == ["alpha", "delta"]
+    assert get_texts(
+        filters={"test_bool": {"eq": False}}, filter_tree={"or_": tree["or_"]}
+    ) == ["delta"]
+
+    response = client.post(
+        "/delete_rows/v0",
+        json={
+            **payload,
+            "filters": {},
+            "filter_tree": {"or_": tree["or_"]},
+        },
+    )
+    assert response.json()["data"]["affected_count"] == 2
+    assert get_texts(filters={}, apply_filters=False) == ["beta", "gamma"]
+
+
+def test_aggregate_rows(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {
+        "database_name": "square",
+        "schema_name": "public",
+        "table_name": "test",
+        "filters": {},
+        "apply_filters": False,
+    }
+
+    def aggregate(**kwargs):
+        response = client.post("/aggregate_rows/v0", json={**payload, **kwargs})
+        assert response.status_code == 200
+        return response.json()["data"]["main"]
+
+    rows = aggregate(
+        group_by=[{"column": "test_enum_enum", "alias": "status"}],
+        aggregates=[
+            {"function": "count"},
+            {"function": "sum", "column": "test_float"},
+            {"function": "min", "column": "test_text", "alias": "first_text"},
+        ],
+        order_by=["-sum_test_float"],
+    )
+    assert [
+        (row["status"], row["count_all"], round(row["sum_test_float"], 2))
+        for row in rows
+    ] == [("RUNNING", 1, 40.99), ("PENDING", 2, 30.5), ("COMPLETED", 1, 30.1)]
+    assert rows[1]["first_text"] == "alpha"
+
+    # having filters groups on an aggregate.
+    rows = aggregate(
+        group_by=[{"column": "test_enum_enum"}],
+        aggregates=[{"function": "count", "alias": "rows"}],
+        having={"rows": {"gt": 1}},
+    )
+    assert rows == [{"test_enum_enum": "PENDING", "rows": 2}]
+
+    rows = aggregate(
+        filters={"test_bool": {"eq": True}},
+        apply_filters=True,
+        aggregates=[
+            {"function": "count"},
+            {"function": "avg", "column": "test_float"},
+            {"function": "count", "column": "test_enum_enum", "distinct": True},
+        ],
+    )
+    assert rows[0]["count_all"] == 2
+    assert round(rows[0]["avg_test_float"], 2) == 20.3
+    assert rows[0]["count_test_enum_enum"] == 2
+
+    # avg and sum are json numbers whatever the column type.
+    rows = aggregate(
+        aggregates=[
+            {"function": "avg", "column": "test_id"},
+            {"function": "sum", "column": "test_id"},
+        ],
+    )
+    assert isinstance(rows[0]["avg_test_id"], float)
+    assert isinstance(rows[0]["sum_test_id"], int)
+
+    # date_trunc buckets, each fixture row is on a different day.
+    rows = aggregate(
+        group_by=[{"column": "test_datetime", "date_trunc": "day", "alias": "day"}],
+        aggregates=[{"function": "count"}],
+        order_by=["day"],
+        limit=3,
+    )
+    assert len(rows) == 3
+    assert all(row["day"].endswith("00:00:00") for row in rows)
+    assert [row["count_all"] for row in rows] == [1, 1, 1]
+
+    # empty filters with apply_filters aggregate over no rows.
+    assert aggregate(apply_filters=True, aggregates=[{"function": "count"}]) == [
+        {"count_all": 0}
+    ]
+
+
+def test_exists_and_count_rows(fixture_all_data_types):
+    client = fixture_all_data_types
+    payload = {"database_name": "square", "schema_name": "public", "table_name": "test"}
+
+    def post(path, **kwargs):
+        response = client.post(path, json={**payload, **kwargs})
+        assert response.status_code == 200
+        return response.json()["data"]
+
+    assert post("/exists_rows/v0", filters={"test_text": {"eq": "alpha"}}) == {
+        "exists": True
+    }
+    assert post("/exists_rows/v0", filters={"test_text": {"eq": "omega"}}) == {
+        "exists": False
+    }
+    assert post("/exists_rows/v0", filters={}) == {"exists": False}
+    assert post("/exists_rows/v0", filters={}, apply_filters=False) == {"exists": True}
+
+    assert post("/count_rows/v0", filters={"test_float": {"gt": 15}}) == {
+        "total_count": 3,
+        "capped": False,
+    }
+    assert post("/count_rows/v0", filters={}, apply_filters=False) == {
+        "total_count": 4,
+        "capped": False,
+    }
+    # counting stops at the cap.
+    assert post("/count_rows/v0", filters={"test_float": {"gt": 15}}, cap=2) == {
+        "total_count": 2,
+        "capped": True,
+    }
+    assert post("/count_rows/v0", filters={"test_float": {"gt": 15}}, cap=10) == {
+        "total_count": 3,
+        "capped": False,
+    }
+    assert post(
+        "/count_rows/v0",
+        filters={},
+        filter_tree={
+            "or_": [
+                {"filters": {"test_text": {"eq": "alpha"}}},
+                {"filters": {"test_text": {"eq": "beta"}}},
+            ]
+        },
+    ) == {"total_count": 2, "capped": False}
+
+
+def test_startup_warmup(create_client_and_cleanup, monkeypatch):
+    import collections
+    import time
+
+    from fastapi.testclient import TestClient
+
+    from square_database import main
+    from square_database.utils import statement_cache, warmup
+
+    monkeypatch.setattr(main, "config_bool_enable_warmup", True)
+    monkeypatch.setattr(
+        statement_cache, "global_dict_statement_cache", collections.OrderedDict()
+    )
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "ready", False)
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "warmed_pool_count", 0)
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "warmed_table_count", 0)
+    monkeypatch.setitem(warmup.global_dict_warmup_state, "errors", [])
+
+    # the lifespan only runs when the client is used as a context manager.
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + 30
+        response = client.get("/ready/v0")
+        while response.status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = client.get("/ready/v0")
+        assert response.status_code == 200
+        assert response.json()["message"] == messages["SERVICE_READY"]
+        warmup_state = response.json()["data"]["main"]
+        assert warmup_state["errors"] == []
+        assert warmup_state["warmed_pool_count"] == 1
+        assert warmup_state["warmed_table_count"] == 13
+
+    statement_keys = list(statement_cache.global_dict_statement_cache)
+    assert any(key[:3] == ("square", "public", "test") for key in statement_keys)
+    assert ("exists_rows", "square", "public", "test") in [
+        key[:4] for key in statement_keys
+    ]